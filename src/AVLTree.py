@@ -1,4 +1,12 @@
+from functools import lru_cache
+
+LOOKUP_CACHE_SIZE = 4096  # Destinos recientes cuyo resultado LPM se recuerda
+_MISS = object()
+
 class Route:
+    __slots__ = ('prefix', 'mask', 'next_hop', 'metric', 'prefix_int', 'mask_int', 'mask_len', 'network',
+                 'sort_key')
+
     def __init__(self, prefix, mask, next_hop, metric=1):
         self.prefix = prefix
         self.mask = mask
@@ -8,15 +16,18 @@ class Route:
         self.mask_int = self.ip_to_int(mask)
         self.mask_len = self.mask_to_len(mask)
         self.network = self.prefix_int & self.mask_int
+        # Orden del árbol: network, mask_len desc, metric asc (una sola comparación de tuplas)
+        self.sort_key = (self.network, -self.mask_len, metric)
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def ip_to_int(ip):
-        parts = ip.split('.')
-        return (int(parts[0]) << 24) + (int(parts[1]) << 16) + (int(parts[2]) << 8) + int(parts[3])
+        # Memoizada: máscaras y next-hops se repiten en casi todas las rutas
+        a, b, c, d = ip.split('.')
+        return (int(a) << 24) | (int(b) << 16) | (int(c) << 8) | int(d)
 
     def mask_to_len(self, mask):
-        m = self.ip_to_int(mask)
-        return bin(m).count('1')
+        return self.ip_to_int(mask).bit_count()
 
     def __str__(self):
         return f"{self.prefix}/{self.mask_len} via {self.next_hop} metric {self.metric}"
@@ -25,17 +36,38 @@ class Route:
         return f"[{self.prefix}/{self.mask_len}]"
 
 class AVLNode:
+    __slots__ = ('route', 'key', 'network', 'left', 'right', 'height')
+
     def __init__(self, route):
-        self.route = route
+        self.set_route(route)
         self.left = None
         self.right = None
         self.height = 1
 
+    def set_route(self, route):
+        # Copia plana de la clave de orden: el descenso no pasa por node.route
+        self.route = route
+        self.key = route.sort_key
+        self.network = route.network
+
 class AVLTree:
     def __init__(self):
         self.root = None
         self.rotations = {'LL': 0, 'LR': 0, 'RL': 0, 'RR': 0}
         self.nodes = 0
+        # Índice directo para longest prefix match: mask_int -> {network: Route}.
+        # El AVL se mantiene para listar las rutas en orden.
+        self._lpm_index = {}
+        self._lpm_masks = []  # Máscaras presentes, de la más larga a la más corta
+        self._compiled_lookup = None  # Función LPM generada para las máscaras actuales
+        # Prefiltro exacto: bits comunes a todas las máscaras y cuántas entradas
+        # del índice cubre cada valor de (network & esos bits). Un destino cuyo
+        # valor no aparece no puede coincidir con ninguna ruta
+        self._prefilter_mask = 0
+        self._prefilter = {}
+        # dest_ip -> Route (o None); se vacía con cualquier cambio de rutas.
+        # Expulsión FIFO: los dict conservan el orden de inserción
+        self._lookup_cache = {}
 
     def height(self, node):
         return node.height if node else 0
@@ -44,7 +76,11 @@ class AVLTree:
         return self.height(node.left) - self.height(node.right) if node else 0
 
     def update_height(self, node):
-        node.height = 1 + max(self.height(node.left), self.height(node.right))
+        # Sin llamadas a height()/max(): se usa en cada nivel del rebalanceo
+        left, right = node.left, node.right
+        lh = left.height if left else 0
+        rh = right.height if right else 0
+        node.height = (lh if lh > rh else rh) + 1
 
     def rotate_right(self, y):
         x = y.left
@@ -65,35 +101,62 @@ class AVLTree:
         return y
 
     def insert(self, root, route):
+        # Iterativo: desciende guardando el camino y rebalancea al subir
+        self.nodes += 1
+        new_node = AVLNode(route)
         if not root:
-            self.nodes += 1
-            return AVLNode(route)
-        if self.compare_routes(route, root.route) < 0:
-            root.left = self.insert(root.left, route)
+            return new_node
+        path = []  # (nodo, bajó por la izquierda)
+        key = route.sort_key
+        node = root
+        while node:
+            went_left = key < node.key
+            path.append((node, went_left))
+            node = node.left if went_left else node.right
+        parent, went_left = path[-1]
+        if went_left:
+            parent.left = new_node
         else:
-            root.right = self.insert(root.right, route)
+            parent.right = new_node
+
+        rebalance = self._rebalance_insert
+        for i in range(len(path) - 1, -1, -1):
+            subtree = rebalance(path[i][0], key)
+            if i:
+                parent, went_left = path[i - 1]
+                if went_left:
+                    parent.left = subtree
+                else:
+                    parent.right = subtree
+            else:
+                root = subtree
+        return root
 
+    def _rebalance_insert(self, root, key):
         self.update_height(root)
-        balance = self.balance(root)
+        left, right = root.left, root.right
+        balance = (left.height if left else 0) - (right.height if right else 0)
+        if -1 <= balance <= 1:
+            return root
 
         # LL
-        if balance > 1 and self.compare_routes(route, root.left.route) < 0:
+        if balance > 1 and key < left.key:
             self.rotations['LL'] += 1
             return self.rotate_right(root)
 
         # RR
-        if balance < -1 and self.compare_routes(route, root.right.route) > 0:
+        if balance < -1 and key > right.key:
             self.rotations['RR'] += 1
             return self.rotate_left(root)
 
         # LR
-        if balance > 1 and self.compare_routes(route, root.left.route) > 0:
+        if balance > 1 and key > left.key:
             self.rotations['LR'] += 1
             root.left = self.rotate_left(root.left)
             return self.rotate_right(root)
 
         # RL
-        if balance < -1 and self.compare_routes(route, root.right.route) < 0:
+        if balance < -1 and key < right.key:
             self.rotations['RL'] += 1
             root.right = self.rotate_right(root.right)
             return self.rotate_left(root)
@@ -110,30 +173,170 @@ class AVLTree:
 
     def add_route(self, route):
         self.root = self.insert(self.root, route)
-
-    def delete(self, root, route):
-        if not root:
-            return root
-        cmp = self.compare_routes(route, root.route)
-        if cmp < 0:
-            root.left = self.delete(root.left, route)
-        elif cmp > 0:
-            root.right = self.delete(root.right, route)
+        self._index_route(route)
+        self._lookup_cache.clear()
+
+    def _index_route(self, route):
+        """Registra la ruta en el índice LPM; gana la de menor métrica."""
+        table = self._lpm_index.get(route.mask_int)
+        if table is None:
+            table = self._lpm_index[route.mask_int] = {}
+            self._sort_lpm_masks()
+        best = table.get(route.network)
+        if best is None:
+            self._prefilter_add(route.network)
+        if best is None or route.metric < best.metric:
+            table[route.network] = route
+
+    def _refresh_index(self, mask_int, network):
+        """Recalcula la entrada del índice para (mask_int, network) a partir del árbol."""
+        # Las rutas con igual (network, mask_len) son contiguas en orden y van
+        # por métrica ascendente: basta bajar una sola vez hasta la primera y
+        # avanzar en orden hasta dar con la máscara exacta
+        target = (network, -mask_int.bit_count())
+        best = None
+        stack = []
+        node = self.root
+        while node:
+            if node.key < target:
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+        while stack:
+            node = stack.pop()
+            if node.network != network or node.key[1] != target[1]:
+                break
+            if node.route.mask_int == mask_int:
+                best = node.route
+                break
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+        table = self._lpm_index.get(mask_int)
+        if best is not None:
+            if table is None:
+                table = self._lpm_index[mask_int] = {}
+                self._sort_lpm_masks()
+            if network not in table:
+                self._prefilter_add(network)
+            table[network] = best
+        elif table is not None:
+            if table.pop(network, None) is not None:
+                self._prefilter_remove(network)
+            if not table:
+                del self._lpm_index[mask_int]
+                self._sort_lpm_masks()
+
+    def _sort_lpm_masks(self):
+        self._lpm_masks = sorted(self._lpm_index, key=int.bit_count, reverse=True)
+        self._compiled_lookup = None  # El conjunto de máscaras cambió: regenerar
+        # Los bits comunes dependen de las máscaras: reconstruir el prefiltro
+        common = 0xFFFFFFFF
+        for mask_int in self._lpm_masks:
+            common &= mask_int
+        self._prefilter_mask = common if self._lpm_masks else 0
+        self._prefilter = {}
+        for table in self._lpm_index.values():
+            for network in table:
+                self._prefilter_add(network)
+
+    def _prefilter_add(self, network):
+        key = network & self._prefilter_mask
+        self._prefilter[key] = self._prefilter.get(key, 0) + 1
+
+    def _prefilter_remove(self, network):
+        key = network & self._prefilter_mask
+        if self._prefilter[key] == 1:
+            del self._prefilter[key]
         else:
-            self.nodes -= 1
-            if not root.left:
-                return root.right
-            elif not root.right:
-                return root.left
-            temp = self.min_value_node(root.right)
-            root.route = temp.route
-            root.right = self.delete(root.right, temp.route)
+            self._prefilter[key] -= 1
+
+    def compile_lookup(self):
+        """
+        Genera una función LPM especializada para las máscaras presentes: cada
+        máscara queda como constante en una cadena de ifs, sin bucle ni
+        atributos. Las tablas por máscara se comparten, así que solo hay que
+        regenerarla cuando aparece o desaparece una máscara.
+        """
+        namespace = {}
+        lines = ["def _lpm(d):"]
+        if self._prefilter_mask and len(self._lpm_masks) > 1:
+            # Descarta en una sola consulta los destinos que ninguna máscara cubre
+            namespace["pre"] = self._prefilter
+            lines.append(f"    if d & {self._prefilter_mask:#010x} not in pre:")
+            lines.append("        return None")
+        for i, mask_int in enumerate(self._lpm_masks):
+            namespace[f"t{i}"] = self._lpm_index[mask_int]
+            lines.append(f"    r = t{i}.get(d & {mask_int:#010x})")
+            lines.append("    if r is not None:")
+            lines.append("        return r")
+        lines.append("    return None")
+        exec("\n".join(lines), namespace)
+        self._compiled_lookup = namespace["_lpm"]
+        return self._compiled_lookup
 
-        if not root:
-            return root
+    def delete(self, root, route):
+        # Iterativo: localiza el nodo, lo desengancha y rebalancea el camino
+        path = []  # (nodo, bajó por la izquierda)
+        key = route.sort_key
+        node = root
+        removed = False
+        while node:
+            node_key = node.key
+            if key != node_key:
+                went_left = key < node_key
+                path.append((node, went_left))
+                node = node.left if went_left else node.right
+                continue
+            if not removed:
+                self.nodes -= 1
+                removed = True
+            if node.left and node.right:
+                # Copiar el sucesor en orden y buscarlo por clave en el subárbol
+                # derecho, como la versión recursiva (con claves repetidas puede
+                # aparecer antes que el mínimo)
+                path.append((node, False))
+                successor = node.right
+                while successor.left:
+                    successor = successor.left
+                node.set_route(successor.route)
+                key = successor.route.sort_key
+                node = node.right
+                continue
+            replacement = node.left if node.left else node.right
+            if path:
+                parent, went_left = path[-1]
+                if went_left:
+                    parent.left = replacement
+                else:
+                    parent.right = replacement
+            else:
+                root = replacement
+            break
+        # Si la clave no está, el camino recorrido se rebalancea igual, como
+        # hacía la versión recursiva en cada nodo visitado
+
+        rebalance = self._rebalance_delete
+        for i in range(len(path) - 1, -1, -1):
+            subtree = rebalance(path[i][0])
+            if i:
+                parent, went_left = path[i - 1]
+                if went_left:
+                    parent.left = subtree
+                else:
+                    parent.right = subtree
+            else:
+                root = subtree
+        return root
 
+    def _rebalance_delete(self, root):
         self.update_height(root)
-        balance = self.balance(root)
+        left, right = root.left, root.right
+        balance = (left.height if left else 0) - (right.height if right else 0)
+        if -1 <= balance <= 1:
+            return root
 
         # LL
         if balance > 1 and self.balance(root.left) >= 0:
@@ -169,36 +372,32 @@ class AVLTree:
         original_nodes = self.nodes
         self.root = self.delete(self.root, route)
         if self.nodes < original_nodes:
-            self.nodes -= 1
+            self._refresh_index(route.mask_int, route.network)
+            self._lookup_cache.clear()
 
     def lookup(self, dest_ip):
-        dest_int = Route.ip_to_int(dest_ip)
-        return self._lookup(self.root, dest_int)
-
-    def _lookup(self, node, dest_int):
-        if not node:
-            return None
-        route = node.route
-        if (dest_int & route.mask_int) == route.network:
-            # Check left for longer prefix
-            left_match = self._lookup(node.left, dest_int)
-            if left_match and left_match.mask_len > route.mask_len:
-                return left_match
-            # Check right
-            right_match = self._lookup(node.right, dest_int)
-            if right_match and right_match.mask_len > route.mask_len:
-                return right_match
+        # El tráfico se concentra en pocos destinos: probar primero la caché
+        cache = self._lookup_cache
+        route = cache.get(dest_ip, _MISS)
+        if route is not _MISS:
             return route
-        elif dest_int < route.network:
-            return self._lookup(node.left, dest_int)
-        else:
-            return self._lookup(node.right, dest_int)
+        # Longest prefix match: una consulta de diccionario por máscara, en orden
+        lpm = self._compiled_lookup or self.compile_lookup()
+        route = lpm(Route.ip_to_int(dest_ip))
+        if len(cache) >= LOOKUP_CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[dest_ip] = route
+        return route
 
     def inorder(self, node, result):
-        if node:
-            self.inorder(node.left, result)
+        stack = []
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
             result.append(node.route)
-            self.inorder(node.right, result)
+            node = node.right
 
     def get_routes(self):
         result = []
@@ -1,11 +1,35 @@
 import json
 import os
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 
+try:
+    import orjson  # Codificador opcional, bastante más rápido que json
+except ImportError:
+    orjson = None
+
+SNAPSHOT_EVERY = 256  # Registros del WAL que disparan una instantánea completa
+
+def _loads(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+def _dumps_line(obj):
+    """Codifica un registro del WAL como una línea JSON en bytes."""
+    return _dumps(obj) + b'\n'
+
 class BTreeNode:
+    __slots__ = ('leaf', 'keys', 'values', 'children', 'next')
+
     def __init__(self, leaf=False):
         self.leaf = leaf
+        # Claves y valores en listas paralelas: bisect trabaja directo sobre keys
         self.keys = []
+        self.values = []
         self.children = []
         self.next = None  # For leaf nodes
 
@@ -14,49 +38,147 @@ class BTree:
         self.order = order
         self.root = BTreeNode(leaf=True)
         self.index_file = index_file
+        # Log de solo-anexado: cada inserción se persiste como una línea
+        # [clave, valor]; index_file es la última instantánea completa
+        self.wal_file = index_file + ".wal"
         self.splits = 0
         self.merges = 0
+        self.generation = 0  # Instantánea a la que corresponde el WAL actual
+        self._dirty = 0  # Registros del WAL posteriores a la instantánea
+        self._wal = None
         self.load_index()
 
     def load_index(self):
         if os.path.exists(self.index_file):
-            with open(self.index_file, 'r') as f:
-                data = json.load(f)
-                self.order = data.get('order', 4)
-                self.splits = data.get('splits', 0)
-                self.merges = data.get('merges', 0)
-                self.root = self.deserialize_node(data['root'])
+            # Lectura binaria: orjson (si está) y json decodifican bytes UTF-8
+            with open(self.index_file, 'rb') as f:
+                data = _loads(f.read())
+            self.order = data.get('order', 4)
+            self.splits = data.get('splits', 0)
+            self.merges = data.get('merges', 0)
+            self.generation = data.get('generation', 0)
+            if 'nodes' in data:
+                self.root = self.deserialize_nodes(data['nodes'])
+            else:
+                self.root = self.deserialize_node(data['root'])  # Formato anidado antiguo
+        self._replay_wal()
+
+    def _replay_wal(self):
+        """Reaplica las inserciones registradas después de la última instantánea."""
+        if not os.path.exists(self.wal_file):
+            return
+        with open(self.wal_file, 'rb') as f:
+            lines = f.read().splitlines()
+        try:
+            header = _loads(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('generation') != self.generation:
+            return  # WAL de una instantánea anterior: ya está incluido en index_file
+        for line in lines[1:]:
+            try:
+                key, value = _loads(line)
+            except ValueError:
+                # Última línea a medio escribir: compactar para no anexar tras ella
+                self.save_index()
+                return
+            self._insert(key, value)
+            self._dirty += 1
+
+    def _append_wal(self, key, value):
+        if self._wal is None:
+            if self._dirty:
+                self._wal = open(self.wal_file, 'ab')
+            else:
+                self._wal = open(self.wal_file, 'wb')
+                self._wal.write(_dumps_line({'generation': self.generation}))
+        self._wal.write(_dumps_line([key, value]))
+        self._wal.flush()
+        self._dirty += 1
 
     def save_index(self):
+        self.generation += 1
         data = {
             'order': self.order,
             'splits': self.splits,
             'merges': self.merges,
-            'root': self.serialize_node(self.root)
+            'generation': self.generation,
+            'nodes': self.serialize_nodes(self.root)
         }
-        with open(self.index_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Escribir a un temporal y reemplazar: index_file nunca queda a medias.
+        # JSON compacto: sin sangría el archivo ocupa menos y se decodifica antes
+        tmp_file = self.index_file + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(_dumps(data))
+        os.replace(tmp_file, self.index_file)
+        # La instantánea ya contiene todo el WAL: descartarlo
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        if os.path.exists(self.wal_file):
+            os.remove(self.wal_file)
+        self._dirty = 0
 
-    def serialize_node(self, node):
-        if not node:
-            return None
-        return {
-            'leaf': node.leaf,
-            'keys': node.keys,
-            'children': [self.serialize_node(child) for child in node.children],
-            'next': node.next
-        }
+    def flush(self):
+        """Compacta el WAL en una instantánea si tiene registros pendientes."""
+        if self._dirty:
+            self.save_index()
+
+    def serialize_nodes(self, root):
+        """
+        Aplana el árbol en una lista de nodos por niveles; los hijos se
+        guardan como índices en esa lista y la raíz es el nodo 0.
+        """
+        queue = [root]
+        records = []
+        i = 0
+        while i < len(queue):
+            node = queue[i]
+            first = len(queue)
+            queue.extend(node.children)
+            records.append({
+                'leaf': node.leaf,
+                'keys': node.keys,
+                'values': node.values,
+                'children': list(range(first, len(queue))),
+                'next': node.next
+            })
+            i += 1
+        return records
+
+    def deserialize_nodes(self, records):
+        nodes = [BTreeNode(leaf=record['leaf']) for record in records]
+        for node, record in zip(nodes, records):
+            self._load_entries(node, record)
+            node.children = [nodes[i] for i in record['children']]
+            node.next = record.get('next')
+        return nodes[0] if nodes else BTreeNode(leaf=True)
 
     def deserialize_node(self, data):
         if not data:
             return None
         node = BTreeNode(leaf=data['leaf'])
-        node.keys = data['keys']
+        self._load_entries(node, data)
         node.children = [self.deserialize_node(child) for child in data['children']]
         node.next = data.get('next')
         return node
 
+    def _load_entries(self, node, record):
+        if 'values' in record:
+            node.keys = record['keys']
+            node.values = record['values']
+        else:
+            # Formato antiguo: 'keys' es una lista de pares [clave, valor]
+            node.keys = [entry[0] for entry in record['keys']]
+            node.values = [entry[1] for entry in record['keys']]
+
     def insert(self, key, value):
+        self._insert(key, value)
+        self._append_wal(key, value)
+        if self._dirty >= SNAPSHOT_EVERY:
+            self.save_index()
+
+    def _insert(self, key, value):
         root = self.root
         if len(root.keys) == (2 * self.order) - 1:
             new_root = BTreeNode()
@@ -66,23 +188,17 @@ class BTree:
             self._insert_non_full(new_root, key, value)
         else:
             self._insert_non_full(root, key, value)
-        self.save_index()
 
     def _insert_non_full(self, node, key, value):
-        i = len(node.keys) - 1
+        # Búsqueda binaria en C; las claves repetidas quedan tras las existentes
+        i = bisect_right(node.keys, key)
         if node.leaf:
-            node.keys.append(None)
-            while i >= 0 and key < node.keys[i][0]:
-                node.keys[i + 1] = node.keys[i]
-                i -= 1
-            node.keys[i + 1] = (key, value)
+            node.keys.insert(i, key)
+            node.values.insert(i, value)
         else:
-            while i >= 0 and key < node.keys[i][0]:
-                i -= 1
-            i += 1
             if len(node.children[i].keys) == (2 * self.order) - 1:
                 self.split_child(node, i)
-                if key > node.keys[i][0]:
+                if key > node.keys[i]:
                     i += 1
             self._insert_non_full(node.children[i], key, value)
 
@@ -92,8 +208,11 @@ class BTree:
         z = BTreeNode(leaf=y.leaf)
         parent.children.insert(i + 1, z)
         parent.keys.insert(i, y.keys[order - 1])
+        parent.values.insert(i, y.values[order - 1])
         z.keys = y.keys[order:(2 * order - 1)]
+        z.values = y.values[order:(2 * order - 1)]
         y.keys = y.keys[0:(order - 1)]
+        y.values = y.values[0:(order - 1)]
         if not y.leaf:
             z.children = y.children[order:(2 * order)]
             y.children = y.children[0:order]
@@ -103,27 +222,26 @@ class BTree:
         return self._search(self.root, key)
 
     def _search(self, node, key):
-        i = 0
-        while i < len(node.keys) and key > node.keys[i][0]:
-            i += 1
-        if i < len(node.keys) and key == node.keys[i][0]:
-            return node.keys[i][1]
-        if node.leaf:
-            return None
-        return self._search(node.children[i], key)
+        while True:
+            keys = node.keys
+            i = bisect_left(keys, key)
+            if i < len(keys) and key == keys[i]:
+                return node.values[i]
+            if node.leaf:
+                return None
+            node = node.children[i]
 
     def inorder_traversal(self, node, result):
         if node:
-            i = 0
-            if not node.leaf:
-                self.inorder_traversal(node.children[i], result)
-            while i < len(node.keys):
-                result.append(node.keys[i])
-                if not node.leaf:
-                    i += 1
-                    self.inorder_traversal(node.children[i], result)
-                else:
-                    i += 1
+            if node.leaf:
+                # Una hoja se vuelca completa de una vez, sin recorrer clave a clave
+                result.extend(zip(node.keys, node.values))
+                return
+            children = node.children
+            self.inorder_traversal(children[0], result)
+            for i, entry in enumerate(zip(node.keys, node.values), 1):
+                result.append(entry)
+                self.inorder_traversal(children[i], result)
 
     def get_snapshots(self):
         result = []
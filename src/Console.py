@@ -1,31 +1,140 @@
-import json
+import sys
+import time
 from Mode import Mode
 from Network import Network
 from Device import Device
 from Interface import Interface
 from Packet import Packet
-from Network_statistics import NetworkStatistics
-from Network_persistence import save_network_config, load_network_config
 from ErrorLog import ErrorLog
-from BTree import BTree
-from datetime import datetime
+from functools import lru_cache
+
+@lru_cache(maxsize=1024)
+def _valid_mask(mask):
+    """Valida una máscara '/N' o punteada; compartida y memoizada entre instancias"""
+    if mask.startswith('/'):
+        try:
+            length = int(mask[1:])
+            return 0 <= length <= 32
+        except ValueError:
+            return False
+    # Forma punteada: mismas reglas por octeto que una dirección IP
+    return Interface.validate_ip(mask)
+
+def _parse_count(text):
+    """
+    Convierte un entero no negativo escrito solo con dígitos ASCII; None si no
+    lo es. int() por sí solo aceptaría también '+5' o '1_0'.
+    """
+    if text.isascii() and text.isdigit():
+        return int(text)
+    return None
+
+try:
+    import readline  # Historial y edición de línea para input()
+except ImportError:  # No disponible en todas las plataformas
+    readline = None
 
 class CLI:
     """
     Interfaz de línea de comandos mejorada para el simulador de red
     Incluye integración de módulos de estadísticas y persistencia.
     """
-    
+
+    # Comandos de dos palabras: (primera, segunda) -> (comando, inicio de argumentos).
+    # No depende de la instancia: se comparte entre todas
+    TWO_WORD_COMMANDS = {
+        ('configure', 'terminal'): ('configure', 1),
+        ('no', 'shutdown'): ('no', 1),
+        ('save', 'snapshot'): ('save_snapshot', 2),
+        ('load', 'config'): ('load_config', 2),
+        ('btree', 'stats'): ('btree_stats', 2),
+    }
+    # Valores aceptados por add_device y set_device_status
+    DEVICE_TYPES = frozenset(['router', 'switch', 'host', 'firewall'])
+    DEVICE_STATUSES = frozenset(['online', 'offline'])
+    # Modos en los que 'exit' cierra la sesión
+    SESSION_EXIT_MODES = frozenset([Mode.USER, Mode.PRIVILEGED])
+    # Comandos que no modifican nada de lo que guarda la persistencia
+    # (dispositivos, interfaces, rutas, políticas y conexiones)
+    READ_ONLY_COMMANDS = frozenset([
+        'enable', 'disable', 'configure', 'interface', 'console', 'exit', 'end',
+        'help', 'show', 'list_devices', 'show_snapshots', 'btree_stats',
+        'ping', 'send', 'tick', 'process', 'save', 'save_snapshot',
+    ])
+    # Textos de ayuda de show, fijos: se escriben de una sola vez
+    SHOW_USER_HELP = (
+        "Comandos show disponibles en modo usuario:\n"
+        "  show interfaces - Muestra interfaces del dispositivo\n"
+    )
+    SHOW_PRIVILEGED_HELP = (
+        "Comandos show disponibles:\n"
+        "  show history - Muestra historial de paquetes\n"
+        "  show interfaces - Muestra interfaces del dispositivo\n"
+        "  show queue - Muestra cola de paquetes pendientes\n"
+        "  show statistics - Muestra estadísticas de red\n"
+        "  show ip route - Muestra tabla de rutas\n"
+        "  show route avl-stats - Muestra estadísticas del AVL\n"
+        "  show ip route-tree - Muestra árbol de rutas\n"
+        "  show ip prefix-tree - Muestra árbol de prefijos\n"
+        "  show error-log - Muestra registro de errores\n"
+        "  show snapshots - Muestra snapshots indexados\n"
+    )
+    SHOW_IP_HELP = (
+        "Comandos show ip disponibles:\n"
+        "  show ip route - Muestra tabla de rutas\n"
+        "  show ip route-tree - Muestra árbol de rutas\n"
+        "  show ip prefix-tree - Muestra árbol de prefijos\n"
+    )
+    # Subcomandos válidos para show, como tuplas de palabras en minúscula;
+    # alimentan el autocompletado con tabulador
+    SHOW_COMMANDS = frozenset([
+        ('show', 'history'),
+        ('show', 'interfaces'),
+        ('show', 'queue'),
+        ('show', 'statistics'),
+        ('show', 'ip'),
+        ('show', 'ip', 'route'),
+        ('show', 'route', 'avl-stats'),
+        ('show', 'ip', 'route-tree'),
+        ('show', 'snapshots'),
+        ('show', 'ip', 'prefix-tree'),
+        ('show', 'error-log'),
+    ])
+
     def __init__(self):
         self.current_device = Device("HostRouter", "host")  # Dispositivo temporal
         self.network = Network()
         self.current_interface = None
-        self.statistics = NetworkStatistics(self.network)
-        self.btree = BTree()
+        self.current_command = None  # Línea original del comando en curso
+        self.config_dirty = True  # False solo si la red coincide con running-config
+        self._statistics = None  # Se crea al primer 'show statistics'
+        self._btree = None  # Índice de snapshots, se abre al primer uso
         self.error_log = ErrorLog()
         self.network.error_log = self.error_log
         self.init_commands()
     
+    @property
+    def statistics(self):
+        """
+        Estadísticas de la red actual; el módulo se importa solo si se usan.
+        Si se cargó otra red, se reutiliza el mismo objeto apuntándolo a ella.
+        """
+        statistics = self._statistics
+        if statistics is None:
+            from Network_statistics import NetworkStatistics
+            statistics = self._statistics = NetworkStatistics(self.network)
+        elif statistics.network is not self.network:
+            statistics.rebind(self.network)
+        return statistics
+
+    @property
+    def btree(self):
+        """Índice B-tree de snapshots; el archivo se lee solo si se usa"""
+        if self._btree is None:
+            from BTree import BTree
+            self._btree = BTree()
+        return self._btree
+
     def init_commands(self):
         """Inicializa todos los comandos disponibles organizados por modo"""
         self.commands = {
@@ -79,90 +188,126 @@ class CLI:
                 'help': self._show_help
             }
         }
-        # Subcomandos válidos para show
-        self.SHOW_COMMANDS = [
-            'show history',
-            'show interfaces',
-            'show queue',
-            'show statistics',
-            'show ip',
-            'show ip route',
-            'show route avl-stats',
-            'show ip route-tree',
-            'show snapshots',
-            'show ip prefix-tree',
-            'show error-log'
-        ]
+        # Un analizador especializado por modo
+        self._parsers = {mode: self._make_parser(mode) for mode in self.commands}
+        # Frases completables con tabulador por modo: comandos simples, los
+        # compuestos cuyo destino existe en el modo y los subcomandos de show
+        self._completions = {}
+        for mode, handlers in self.commands.items():
+            phrases = {(cmd,) for cmd in handlers}
+            phrases.update(pair for pair, (target, _) in self.TWO_WORD_COMMANDS.items()
+                           if target in handlers)
+            if mode == Mode.PRIVILEGED:
+                phrases.update(self.SHOW_COMMANDS)
+            elif 'show' in handlers:
+                phrases.add(('show', 'interfaces'))  # Único show en modo usuario
+            self._completions[mode] = phrases
+        self._completion_matches = []
+        # Texto de ayuda por modo, fijo mientras no cambien los comandos
+        self._help_text = {
+            mode: "Comandos disponibles:\n" + "".join(
+                f"- {cmd}\n" for cmd in handlers if cmd not in ('help', 'exit', 'end'))
+            for mode, handlers in self.commands.items()
+        }
+        # Subcomandos de show en modo privilegiado: (subcomando, segunda palabra)
+        # -> manejador; None en la segunda posición acepta cualquier resto
+        self._show_dispatch = {
+            ('history', None): self._show_history,
+            ('interfaces', None): self._show_interfaces,
+            ('queue', None): self._show_queue,
+            ('statistics', None): self._show_statistics,
+            ('snapshots', None): self._show_snapshots,
+            ('ip', 'route'): lambda args: self.current_device.show_routing_table(),
+            ('ip', 'route-tree'): lambda args: self.current_device.show_route_tree(),
+            ('ip', 'prefix-tree'): lambda args: self.current_device.policy_trie.print_tree(),
+            ('ip', None): self._show_ip_help,
+            ('route', 'avl-stats'): lambda args: self.current_device.show_avl_stats(),
+        }
 
     def parse_command(self, command):
         """Procesa un comando ingresado por el usuario"""
-        if not command.strip():
-            print(self.get_prompt(), end='')
-            return
-
-        parts = command.strip().split()
-        cmd = parts[0].lower()
-        args = parts[1:]
-
-        # Manejo de comandos compuestos
-        if cmd == 'configure' and len(parts) > 1 and parts[1].lower() == 'terminal':
-            cmd = 'configure'
-        elif cmd == 'no' and len(parts) > 1 and parts[1].lower() == 'shutdown':
-            cmd = 'no'
-        elif cmd == 'save' and len(parts) > 1 and parts[1].lower() == 'snapshot':
-            cmd = 'save_snapshot'
-            args = parts[2:]
-        elif cmd == 'load' and len(parts) > 1 and parts[1].lower() == 'config':
-            cmd = 'load_config'
-            args = parts[2:]
-        elif cmd == 'btree' and len(parts) > 1 and parts[1].lower() == 'stats':
-            cmd = 'btree_stats'
-            args = parts[2:]
-        elif cmd == 'show' and len(parts) > 1:
-            full_show = ' '.join(parts).lower()
-            if full_show in self.SHOW_COMMANDS:
-                cmd = 'show'
-                args = parts[1:]
-
-        if cmd in self.commands[self.current_device.mode]:
-            try:
-                self.commands[self.current_device.mode][cmd](args)
-            except Exception as e:
-                self.error_log.log_error("CommandError", str(e), command)
-                print(f"Error ejecutando comando: {e}")
-        else:
-            self.error_log.log_error("CommandNotFound", f"Comando '{cmd}' no reconocido", command)
-            print(f"% Comando '{cmd}' no reconocido o no disponible en el modo actual")
+        self.parse_tokens(command.split(), command)
+
+    def parse_tokens(self, parts, command):
+        """
+        Procesa un comando ya dividido en palabras; command es la línea
+        original, que solo se recorta si hay que registrar un error.
+        """
+        if not parts:
+            return
+        self.current_command = command
+        self._parsers[self.current_device.mode](parts, command)
+
+    def _make_parser(self, mode):
+        """
+        Construye el analizador especializado de un modo: cierra sobre sus
+        manejadores y solo sobre los comandos compuestos que existen en él.
+        """
+        handlers = self.commands[mode]
+        compounds = {pair: target for pair, target in self.TWO_WORD_COMMANDS.items()
+                     if target[0] in handlers}
+        read_only = self.READ_ONLY_COMMANDS
+
+        def parse(parts, command):
+            cmd = parts[0].lower()
+            args = parts[1:]
+            # Primer argumento en minúscula, calculado una sola vez: sirve para
+            # detectar comandos compuestos y se pasa a los manejadores show
+            subcmd = args[0].lower() if args else None
+
+            # Manejo de comandos compuestos (ninguno en modos sin ellos)
+            if compounds and subcmd is not None:
+                compound = compounds.get((cmd, subcmd))
+                if compound:
+                    cmd, start = compound
+                    if start != 1:
+                        # Con start == 1 los argumentos no cambian y subcmd sigue valiendo
+                        args = parts[start:]
+                        subcmd = args[0].lower() if args else None
+            handler = handlers.get(cmd)
+            if handler:
+                if cmd not in read_only:
+                    self.config_dirty = True
+                try:
+                    if cmd == 'show':
+                        handler(args, subcmd)
+                    else:
+                        handler(args)
+                except Exception as e:
+                    self.error_log.log_error("CommandError", str(e), self._command_text)
+                    print(f"Error ejecutando comando: {e}")
+            else:
+                self.error_log.log_error("CommandNotFound", f"Comando '{cmd}' no reconocido", self._command_text)
+                print(f"% Comando '{cmd}' no reconocido o no disponible en el modo actual")
+
+        return parse
+
+    def _command_text(self):
+        """
+        Texto del comando en curso para el registro de errores. Se pasa sin
+        llamar (self._command_text): solo se recorta si el registro está activo.
+        """
+        command = self.current_command
+        return command.strip() if command is not None else None
 
     def get_prompt(self):
-        """Genera el prompt según el modo actual"""
-        if self.current_device.mode == Mode.USER:
-            return f"{self.current_device.name}>"
-        elif self.current_device.mode == Mode.PRIVILEGED:
-            return f"{self.current_device.name}#"
-        elif self.current_device.mode == Mode.CONFIG:
-            return f"{self.current_device.name}(config)#"
-        elif self.current_device.mode == Mode.CONFIG_IF:
-            return f"{self.current_device.name}(config-if)#"
-        return ">"
+        """Devuelve el prompt precalculado del dispositivo para el modo actual"""
+        return self.current_device.get_prompt()
 
     # Implementación de comandos
     def _enable(self, args):
         """Cambia a modo privilegiado"""
         if self.current_device.mode == Mode.USER:
             self.current_device.mode = Mode.PRIVILEGED
-        print(self.get_prompt(), end='')
 
     def _disable(self, args):
         """Regresa a modo usuario"""
         self.current_device.mode = Mode.USER
-        print(self.get_prompt(), end='')
 
     def _configure_terminal(self, args):
         """Entra en modo configuración global"""
         if self.current_device.mode == Mode.PRIVILEGED:
             self.current_device.mode = Mode.CONFIG
-        print(self.get_prompt(), end='')
 
     def _exit_privileged(self, args):
         """Sale del modo privilegiado"""
@@ -172,12 +317,10 @@ class CLI:
         """Sale del modo configuración global"""
         if self.current_device.mode == Mode.CONFIG:
             self.current_device.mode = Mode.PRIVILEGED
-        print(self.get_prompt(), end='')
 
     def _end_config(self, args):
         """Termina configuración y regresa a modo privilegiado"""
         self.current_device.mode = Mode.PRIVILEGED
-        print(self.get_prompt(), end='')
 
     def _configure_interface(self, args):
         """Entra en modo configuración de interfaz"""
@@ -186,21 +329,19 @@ class CLI:
             return
             
         iface_name = args[0]
-        iface = next((i for i in self.current_device.get_interfaces() if i.name == iface_name), None)
-        
+        iface = self.current_device.get_interface(iface_name)
+
         if iface:
             self.current_interface = iface
             self.current_device.mode = Mode.CONFIG_IF
         else:
-            self.error_log.log_error("InterfaceNotFound", f"La interfaz {iface_name} no existe", f"interface {iface_name}")
+            self.error_log.log_error("InterfaceNotFound", f"La interfaz {iface_name} no existe", self._command_text)
             print(f"% La interfaz {iface_name} no existe")
-        print(self.get_prompt(), end='')
 
     def _exit_interface(self, args):
         """Sale del modo configuración de interfaz"""
         self.current_device.mode = Mode.CONFIG
         self.current_interface = None
-        print(self.get_prompt(), end='')
 
     def _set_hostname(self, args):
         """Configura el nombre del dispositivo"""
@@ -210,16 +351,11 @@ class CLI:
             
         new_name = args[0]
         if self.network.get_device(new_name):
-            self.error_log.log_error("HostnameInUse", f"El nombre {new_name} ya está en uso", f"hostname {new_name}")
+            self.error_log.log_error("HostnameInUse", f"El nombre {new_name} ya está en uso", self._command_text)
             print(f"% El nombre {new_name} ya está en uso")
-        else:
-            old_name = self.current_device.name
-            self.current_device.name = new_name
-            # Actualizar en la red
-            device = self.network.get_device(old_name)
-            if device:
-                device.name = new_name
-        print(self.get_prompt(), end='')
+        elif not self.network.rename_device(self.current_device, new_name):
+            # Dispositivo fuera de la red (p. ej. el temporal inicial)
+            self.current_device.set_name(new_name)
 
     def _set_ip_address(self, args):
         """Configura dirección IP de la interfaz actual"""
@@ -233,50 +369,31 @@ class CLI:
                 self.current_interface.set_ip(ip)
                 print(f"Interface {self.current_interface.name} configurada con IP {ip}")
             else:
-                self.error_log.log_error("InvalidIP", f"Dirección IP inválida: {ip}", f"ip address {ip}")
+                self.error_log.log_error("InvalidIP", f"Dirección IP inválida: {ip}", self._command_text)
                 print("% Dirección IP inválida")
         else:
-            self.error_log.log_error("NoInterfaceSelected", "Ninguna interfaz seleccionada", f"ip address {ip}")
+            self.error_log.log_error("NoInterfaceSelected", "Ninguna interfaz seleccionada", self._command_text)
             print("% Ninguna interfaz seleccionada")
-        print(self.get_prompt(), end='')
 
     def _validate_ip(self, ip):
         """Valida formato básico de dirección IP"""
-        parts = ip.split('.')
-        if len(parts) != 4:
-            return False
-        return all(part.isdigit() and 0 <= int(part) <= 255 for part in parts)
+        return Interface.validate_ip(ip)
 
     def _validate_mask(self, mask):
         """Valida formato de máscara de red"""
-        if mask.startswith('/'):
-            try:
-                length = int(mask[1:])
-                return 0 <= length <= 32
-            except ValueError:
-                return False
-        else:
-            parts = mask.split('.')
-            if len(parts) != 4:
-                return False
-            try:
-                return all(part.isdigit() and 0 <= int(part) <= 255 for part in parts)
-            except ValueError:
-                return False
+        return _valid_mask(mask)
 
     def _shutdown_interface(self, args):
         """Desactiva la interfaz actual"""
         if self.current_interface:
             self.current_interface.shutdown()
             print(f"Interface {self.current_interface.name} desactivada")
-        print(self.get_prompt(), end='')
 
     def _no_shutdown(self, args):
         """Activa la interfaz actual"""
         if self.current_interface:
             self.current_interface.no_shutdown()
             print(f"Interface {self.current_interface.name} activada")
-        print(self.get_prompt(), end='')
 
     def _ip_command(self, args):
         """Maneja comandos ip"""
@@ -286,41 +403,43 @@ class CLI:
         if len(args) < 4:
             print("Uso: ip route <add|del> <prefix> <mask> [via <next-hop>] [metric N]")
             return
+        device = self.current_device
         action = args[1]
         prefix = args[2]
         mask = args[3]
         next_hop = ""
         metric = 1
         if action == 'add':
-            if len(args) > 4:
-                if 'via' in args:
-                    idx = args.index('via')
-                    if idx + 1 < len(args):
-                        next_hop = args[idx + 1]
-                if 'metric' in args:
-                    idx = args.index('metric')
-                    if idx + 1 < len(args):
-                        try:
-                            metric = int(args[idx + 1])
-                        except ValueError:
-                            self.error_log.log_error("InvalidMetric", f"Métrica inválida: {args[idx + 1]}", f"ip route add {prefix} {mask} metric {args[idx + 1]}")
-                            print("Métrica inválida")
-                            return
-            self.current_device.add_route(prefix, mask, next_hop, metric)
+            # Una sola pasada por las opciones; cuenta la primera aparición de cada una
+            options = {}
+            for i in range(4, len(args) - 1):
+                token = args[i]
+                if (token == 'via' or token == 'metric') and token not in options:
+                    options[token] = args[i + 1]
+            next_hop = options.get('via', next_hop)
+            raw_metric = options.get('metric')
+            if raw_metric is not None:
+                try:
+                    metric = int(raw_metric)
+                except ValueError:
+                    self.error_log.log_error("InvalidMetric", lambda: f"Métrica inválida: {raw_metric}", self._command_text)
+                    print("Métrica inválida")
+                    return
+            device.add_route(prefix, mask, next_hop, metric)
             print(f"Ruta añadida: {prefix}/{mask} via {next_hop} metric {metric}")
         elif action == 'del':
-            self.current_device.del_route(prefix, mask)
+            device.del_route(prefix, mask)
             print(f"Ruta eliminada: {prefix}/{mask}")
         else:
-            self.error_log.log_error("InvalidAction", f"Acción inválida: {action}", f"ip route {action} {prefix} {mask}")
+            self.error_log.log_error("InvalidAction", lambda: f"Acción inválida: {action}", self._command_text)
             print("Acción inválida. Use 'add' o 'del'")
-        print(self.get_prompt(), end='')
 
     def _policy_command(self, args):
         """Maneja comandos policy"""
         if not args:
             print("Uso: policy <set|unset> <prefix> <mask> [tipo valor]")
             return
+        device = self.current_device
         action = args[0]
         if action == 'set':
             if len(args) < 4:
@@ -329,17 +448,17 @@ class CLI:
             prefix = args[1]
             mask = args[2]
             if not self._validate_ip(prefix):
-                self.error_log.log_error("InvalidIP", f"Prefijo IP inválido: {prefix}", f"policy set {prefix} {mask}")
+                self.error_log.log_error("InvalidIP", lambda: f"Prefijo IP inválido: {prefix}", self._command_text)
                 print("% Prefijo IP inválido")
                 return
             if not self._validate_mask(mask):
-                self.error_log.log_error("InvalidMask", f"Máscara inválida: {mask}", f"policy set {prefix} {mask}")
+                self.error_log.log_error("InvalidMask", lambda: f"Máscara inválida: {mask}", self._command_text)
                 print("% Máscara inválida")
                 return
             policy_type = args[3]
             policy_value = args[4] if len(args) > 4 else None
             if policy_type == 'block':
-                self.current_device.set_policy(prefix, mask, policy_type)
+                device.set_policy(prefix, mask, policy_type)
                 print(f"Política block aplicada a {prefix}/{mask}")
             elif policy_type == 'ttl-min':
                 if policy_value is None:
@@ -348,13 +467,13 @@ class CLI:
                 try:
                     int(policy_value)
                 except ValueError:
-                    self.error_log.log_error("InvalidTTL", f"Valor de TTL inválido: {policy_value}", f"policy set {prefix} {mask} ttl-min {policy_value}")
+                    self.error_log.log_error("InvalidTTL", lambda: f"Valor de TTL inválido: {policy_value}", self._command_text)
                     print("% Valor de TTL inválido")
                     return
-                self.current_device.set_policy(prefix, mask, policy_type, int(policy_value))
+                device.set_policy(prefix, mask, policy_type, int(policy_value))
                 print(f"Política ttl-min={policy_value} aplicada a {prefix}/{mask}")
             else:
-                self.error_log.log_error("InvalidPolicyType", f"Tipo de política inválido: {policy_type}", f"policy set {prefix} {mask} {policy_type}")
+                self.error_log.log_error("InvalidPolicyType", lambda: f"Tipo de política inválido: {policy_type}", self._command_text)
                 print("Tipo de política inválido")
         elif action == 'unset':
             if len(args) < 3:
@@ -363,19 +482,18 @@ class CLI:
             prefix = args[1]
             mask = args[2]
             if not self._validate_ip(prefix):
-                self.error_log.log_error("InvalidIP", f"Prefijo IP inválido: {prefix}", f"policy unset {prefix} {mask}")
+                self.error_log.log_error("InvalidIP", lambda: f"Prefijo IP inválido: {prefix}", self._command_text)
                 print("% Prefijo IP inválido")
                 return
             if not self._validate_mask(mask):
-                self.error_log.log_error("InvalidMask", f"Máscara inválida: {mask}", f"policy unset {prefix} {mask}")
+                self.error_log.log_error("InvalidMask", lambda: f"Máscara inválida: {mask}", self._command_text)
                 print("% Máscara inválida")
                 return
-            self.current_device.unset_policy(prefix, mask)
+            device.unset_policy(prefix, mask)
             print(f"Política eliminada de {prefix}/{mask}")
         else:
-            self.error_log.log_error("InvalidPolicyAction", f"Acción inválida: {action}", f"policy {action}")
+            self.error_log.log_error("InvalidPolicyAction", lambda: f"Acción inválida: {action}", self._command_text)
             print("Acción inválida. Use 'set' o 'unset'")
-        print(self.get_prompt(), end='')
 
     def _connect(self, args):
         """Conecta dos interfaces de dispositivos"""
@@ -389,9 +507,8 @@ class CLI:
         if self.network.connect(dev1, iface1, dev2, iface2):
             print(f"Conexión establecida: {dev1}:{iface1} <-> {dev2}:{iface2}")
         else:
-            self.error_log.log_error("ConnectionError", f"No se pudo establecer la conexión: {dev1}:{iface1} <-> {dev2}:{iface2}", f"connect {iface1} {dev2} {iface2}")
+            self.error_log.log_error("ConnectionError", f"No se pudo establecer la conexión: {dev1}:{iface1} <-> {dev2}:{iface2}", self._command_text)
             print("% No se pudo establecer la conexión. Verifique los nombres.")
-        print(self.get_prompt(), end='')
 
     def _disconnect(self, args):
         """Desconecta dos interfaces"""
@@ -405,9 +522,8 @@ class CLI:
         if self.network.disconnect(dev1, iface1, dev2, iface2):
             print(f"Conexión eliminada: {dev1}:{iface1} <-> {dev2}:{iface2}")
         else:
-            self.error_log.log_error("DisconnectionError", f"No se pudo eliminar la conexión: {dev1}:{iface1} <-> {dev2}:{iface2}", f"disconnect {iface1} {dev2} {iface2}")
+            self.error_log.log_error("DisconnectionError", f"No se pudo eliminar la conexión: {dev1}:{iface1} <-> {dev2}:{iface2}", self._command_text)
             print("% No se pudo eliminar la conexión. Verifique los nombres.")
-        print(self.get_prompt(), end='')
 
     def _set_device_status(self, args):
         """Configura estado de un dispositivo (online/offline)"""
@@ -416,134 +532,138 @@ class CLI:
             return
             
         dev, status = args
-        if status in ['online', 'offline']:
+        if status in self.DEVICE_STATUSES:
             if self.network.set_device_status(dev, 'up' if status == 'online' else 'down'):
                 print(f"Estado de {dev} cambiado a {status}")
             else:
-                self.error_log.log_error("DeviceNotFound", f"Dispositivo no encontrado: {dev}", f"set_device_status {dev} {status}")
+                self.error_log.log_error("DeviceNotFound", f"Dispositivo no encontrado: {dev}", self._command_text)
                 print("% Dispositivo no encontrado")
         else:
             print("% Estado inválido. Use 'online' u 'offline'")
-        print(self.get_prompt(), end='')
 
     def _list_devices(self, args):
         """Lista todos los dispositivos en la red"""
-        print("Dispositivos en la red:")
-        for device in self.network.list_devices():
+        out = ["Dispositivos en la red:"]
+        for device in self.network.devices:
             status = "online" if device.status == 'up' else "offline"
-            print(f"- {device.name} ({device.device_type}, {status})")
-        print(self.get_prompt(), end='')
+            out.append(f"- {device.name} ({device.device_type}, {status})")
+        out.append("")
+        sys.stdout.write("\n".join(out))
 
-    def _show_user(self, args):
-        """Comandos show disponibles en modo usuario"""
+    def _show_user(self, args, subcmd=None):
+        """
+        Comandos show disponibles en modo usuario; subcmd es args[0] en
+        minúscula si el analizador ya lo calculó.
+        """
         if not args:
-            print("Comandos show disponibles en modo usuario:")
-            print("  show interfaces - Muestra interfaces del dispositivo")
+            sys.stdout.write(self.SHOW_USER_HELP)
             return
             
-        subcmd = args[0].lower()
+        if subcmd is None:
+            subcmd = args[0].lower()
         if subcmd == 'interfaces':
             self._show_interfaces(args[1:])
         else:
             print("% Comando show no reconocido")
-        print(self.get_prompt(), end='')
 
-    def _show_privileged(self, args):
-        """Comandos show disponibles en modo privilegiado"""
+    def _show_privileged(self, args, subcmd=None):
+        """
+        Comandos show disponibles en modo privilegiado; subcmd es args[0] en
+        minúscula si el analizador ya lo calculó.
+        """
         if not args:
-            print("Comandos show disponibles:")
-            print("  show history - Muestra historial de paquetes")
-            print("  show interfaces - Muestra interfaces del dispositivo")
-            print("  show queue - Muestra cola de paquetes pendientes")
-            print("  show statistics - Muestra estadísticas de red")
-            print("  show ip route - Muestra tabla de rutas")
-            print("  show route avl-stats - Muestra estadísticas del AVL")
-            print("  show ip route-tree - Muestra árbol de rutas")
-            print("  show ip prefix-tree - Muestra árbol de prefijos")
-            print("  show error-log - Muestra registro de errores")
-            print("  show snapshots - Muestra snapshots indexados")
+            sys.stdout.write(self.SHOW_PRIVILEGED_HELP)
             return
             
-        subcmd = args[0].lower()
-        if subcmd == 'history':
-            self._show_history(args[1:])
-        elif subcmd == 'interfaces':
-            self._show_interfaces(args[1:])
-        elif subcmd == 'queue':
-            self._show_queue(args[1:])
-        elif subcmd == 'statistics':
-            self._show_statistics(args[1:])
-        elif subcmd == 'ip' and len(args) > 1 and args[1] == 'route':
-            self.current_device.show_routing_table()
-        elif subcmd == 'route' and len(args) > 1 and args[1] == 'avl-stats':
-            self.current_device.show_avl_stats()
-        elif subcmd == 'ip' and len(args) > 1 and args[1] == 'route-tree':
-            self.current_device.show_route_tree()
-        elif subcmd == 'ip' and len(args) > 1 and args[1] == 'prefix-tree':
-            self.current_device.policy_trie.print_tree()
-        elif subcmd == 'error-log':
-            n = int(args[1]) if len(args) > 1 and args[1].isdigit() else None
+        if subcmd is None:
+            subcmd = args[0].lower()
+        if subcmd == 'error-log':
+            n = _parse_count(args[1]) if len(args) > 1 else None
             errors = self.error_log.get_errors(n)
             if not errors:
                 print("No hay errores registrados")
             else:
                 for error in errors:
                     print(error)
-        elif subcmd == 'ip':
-            print("Comandos show ip disponibles:")
-            print("  show ip route - Muestra tabla de rutas")
-            print("  show ip route-tree - Muestra árbol de rutas")
-            print("  show ip prefix-tree - Muestra árbol de prefijos")
-        elif subcmd == 'snapshots':
-            self._show_snapshots(args[1:])
-        else:
+                # Totales por tipo desde los contadores, sin recorrer la cola
+                counts = self.error_log.get_counts()
+                print("Totales por tipo: " + ", ".join(
+                    f"{error_type}={count}" for error_type, count in sorted(counts.items())))
+            return
+
+        # Primero (subcomando, segunda palabra); si no existe, solo el subcomando
+        handler = None
+        if len(args) > 1:
+            handler = self._show_dispatch.get((subcmd, args[1]))
+        if handler is None:
+            handler = self._show_dispatch.get((subcmd, None))
+        if handler is None:
             print("% Comando show no reconocido")
-        print(self.get_prompt(), end='')
+        else:
+            handler(args[1:])
+
+    def _show_ip_help(self, args):
+        """Ayuda de show ip cuando falta o no se reconoce la segunda palabra"""
+        sys.stdout.write(self.SHOW_IP_HELP)
 
     def _show_history(self, args):
         """
         Muestra historial de paquetes enviados y recibidos por el dispositivo actual.
         """
         sent, received = self.current_device.get_history()
-
-        print("Historial de paquetes enviados:")
+        # Se acumulan las líneas y se escriben de una vez
+        out = ["Historial de paquetes enviados:"]
         if sent:
             for i, packet in enumerate(sent, 1):
-                path = ' → '.join(packet.path.to_list()) if hasattr(packet, 'path') and hasattr(packet.path, 'to_list') else 'N/A'
-                ttl_expired = 'Sí' if getattr(packet, 'ttl', 1) == 0 else 'No'
-                print(f"{i}) A {packet.destination_ip}: \"{packet.content}\" | TTL al enviar: {getattr(packet, 'ttl', 'N/A')} | Ruta: {path} | TTL expirado? {ttl_expired}")
+                path, ttl, ttl_expired = self._history_fields(packet)
+                out.append(f"{i}) A {packet.destination_ip}: \"{packet.content}\" | TTL al enviar: {ttl} | Ruta: {path} | TTL expirado? {ttl_expired}")
         else:
-            print("  (Ningún paquete enviado)")
+            out.append("  (Ningún paquete enviado)")
 
-        print("\nHistorial de paquetes recibidos:")
+        out.append("\nHistorial de paquetes recibidos:")
         if received:
             for i, packet in enumerate(received, 1):
-                path = ' → '.join(packet.path.to_list()) if hasattr(packet, 'path') and hasattr(packet.path, 'to_list') else 'N/A'
-                ttl_expired = 'Sí' if getattr(packet, 'ttl', 1) == 0 else 'No'
-                print(f"{i}) De {packet.source_ip}: \"{packet.content}\" | TTL al recibir: {getattr(packet, 'ttl', 'N/A')} | Ruta: {path} | TTL expirado? {ttl_expired}")
+                path, ttl, ttl_expired = self._history_fields(packet)
+                out.append(f"{i}) De {packet.source_ip}: \"{packet.content}\" | TTL al recibir: {ttl} | Ruta: {path} | TTL expirado? {ttl_expired}")
         else:
-            print("  (Ningún paquete recibido)")
+            out.append("  (Ningún paquete recibido)")
+        out.append("")
+        sys.stdout.write("\n".join(out))
+
+    @staticmethod
+    def _history_fields(packet):
+        """
+        Retorna (ruta, ttl, ttl expirado) de un paquete del historial.
+        Los paquetes son homogéneos: acceso directo y 'N/A' solo si falta algo.
+        """
+        try:
+            path = ' → '.join(packet.path.to_list())
+        except AttributeError:
+            path = 'N/A'
+        try:
+            ttl = packet.ttl
+        except AttributeError:
+            return path, 'N/A', 'No'
+        return path, ttl, 'Sí' if ttl == 0 else 'No'
 
     def _show_interfaces(self, args):
         """Muestra estado de las interfaces"""
-        print("Interfaces:")
+        out = ["Interfaces:"]
         for iface in self.current_device.get_interfaces():
             status = iface.status
             ip = iface.ip_address if iface.ip_address else "no asignada"
-            neighbors = 'no conectada'
-            if iface.neighbors:
-                if hasattr(iface.neighbors, 'to_list'):
-                    vecinos_list = iface.neighbors.to_list()
-                    neighbors = ', '.join([n.name for n in vecinos_list]) if vecinos_list else 'no conectada'
-                else:
-                    neighbors = str(iface.neighbors)
-            print(f"- {iface.name}: IP {ip}, estado {status}, vecinos: {neighbors}")
+            neighbors = iface.neighbor_names() or 'no conectada'
+            out.append(f"- {iface.name}: IP {ip}, estado {status}, vecinos: {neighbors}")
+        out.append("")
+        sys.stdout.write("\n".join(out))
 
     def _show_queue(self, args):
         """Muestra paquetes en cola"""
-        print("Paquetes en cola:")
+        out = ["Paquetes en cola:"]
         for i, packet in enumerate(self.current_device.get_queue(), 1):
-            print(f"{i}) De {packet.source_ip} a {packet.destination_ip}: {packet.content}")
+            out.append(f"{i}) De {packet.source_ip} a {packet.destination_ip}: {packet.content}")
+        out.append("")
+        sys.stdout.write("\n".join(out))
 
     def _show_statistics(self, args):
         """
@@ -555,7 +675,6 @@ class CLI:
             self.statistics.export_statistics(filename)
         else:
             self.statistics.show_statistics()
-        print(self.get_prompt(), end='')
 
     def _send_packet(self, args):
         """Envía un paquete (simulado) y registra en historial de emisor y receptor"""
@@ -563,36 +682,34 @@ class CLI:
             print("Uso: send <ip_origen> <ip_destino> <mensaje> [ttl]")
             return
 
-        source, dest, message = args[0], args[1], ' '.join(args[2:-1]) if len(args) > 3 else args[2]
-        ttl = int(args[-1]) if len(args) > 3 and args[-1].isdigit() else 5
+        source, dest = args[0], args[1]
+        # La última palabra es el TTL solo si es un número; se evalúa una vez
+        ttl = _parse_count(args[-1]) if len(args) > 3 else None
+        if ttl is None:
+            ttl = 5
+            message_parts = args[2:]
+        else:
+            message_parts = args[2:-1]
+        message = message_parts[0] if len(message_parts) == 1 else ' '.join(message_parts)
 
         # Enviar el paquete usando la lógica de red
         sent = self.network.send_packet(source, dest, message, ttl)
         if sent:
             print(f"Mensaje en cola para entrega: '{message}' de {source} a {dest} (TTL={ttl})")
-            # Registrar en historial de enviados del emisor
-            from Packet import Packet
+            # Registrar en historial de enviados del emisor; el receptor
+            # comparte el mismo objeto, ninguno de los historiales lo modifica
             pkt = Packet(source, dest, message, ttl)
             if hasattr(self.current_device, 'add_sent'):
                 self.current_device.add_sent(pkt)
 
             # Buscar el receptor por IP de destino
-            receptor = None
-            for device in self.network.list_devices():
-                for iface in device.get_interfaces():
-                    if iface.ip_address == dest:
-                        receptor = device
-                        break
-                if receptor:
-                    break
+            found = self.network.find_by_ip(dest)
+            receptor = found[0] if found else None
             if receptor and hasattr(receptor, 'add_received'):
-                from Packet import Packet
-                pkt2 = Packet(source, dest, message, ttl)
-                receptor.add_received(pkt2)
+                receptor.add_received(pkt)
         else:
-            self.error_log.log_error("SendError", f"No se encontró la interfaz con la IP de origen especificada: {source}", f"send {source} {dest} {message}")
+            self.error_log.log_error("SendError", f"No se encontró la interfaz con la IP de origen especificada: {source}", self._command_text)
             print("% No se encontró la interfaz con la IP de origen especificada")
-        print(self.get_prompt(), end='')
 
     def _ping(self, args):
         """Simula comando ping"""
@@ -601,26 +718,36 @@ class CLI:
             return
             
         print(f"Enviando ping a {args[0]}... (simulado)")
-        print(self.get_prompt(), end='')
 
     def _process_tick(self, args):
-        """Procesa un paso de simulación"""
-        self.network.tick()
-        print("Paso de simulación completado")
-        print(self.get_prompt(), end='')
+        """
+        Procesa uno o varios pasos de simulación en un solo comando.
+        Uso: tick [pasos]
+        """
+        steps = _parse_count(args[0]) if args else 1
+        if steps is None:
+            print("Uso: tick [pasos]")
+            return
+        tick = self.network.tick
+        for _ in range(steps):
+            tick()
+        if steps == 1:
+            print("Paso de simulación completado")
+        else:
+            print(f"{steps} pasos de simulación completados")
 
     def _save_config(self, args):
         """
         Guarda configuración actual a archivo usando el módulo de persistencia.
         Uso: save [archivo]
         """
+        from Network_persistence import save_network_config
         filename = args[0] if args else 'running-config.json'
         try:
             save_network_config(self.network, filename)
         except Exception as e:
-            self.error_log.log_error("SaveConfigError", f"Error guardando configuración: {e}", f"save {filename}")
+            self.error_log.log_error("SaveConfigError", f"Error guardando configuración: {e}", self._command_text)
             print(f"% Error guardando configuración: {e}")
-        print(self.get_prompt(), end='')
 
     def _load_config(self, args):
         """
@@ -629,17 +756,13 @@ class CLI:
         """
         if not args:
             print("Uso: load <archivo>")
-            print(self.get_prompt(), end='')
             return
+        from Network_persistence import read_config_file
         filename = args[0]
         try:
             # Cargar config manualmente para poder asignar status a interfaces
-            import json
-            from Interface import Interface
-            from Device import Device
-            with open(filename) as f:
-                config = json.load(f)
-            self.network = Network()
+            config = read_config_file(filename)
+            self.network.clear()
             for device_data in config['devices']:
                 device = Device(device_data['name'], device_data['type'])
                 device.set_status(device_data['status'])
@@ -652,47 +775,96 @@ class CLI:
                     device.add_interface(iface)
             for conn in config['connections']:
                 self.network.connect(*conn)
-            self.statistics = NetworkStatistics(self.network)
-            devices = self.network.list_devices()
-            if devices:
-                self.current_device = devices[0]
+            first = self.network.first_device()
+            if first is not None:
+                self.current_device = first
             print(f"Configuración cargada desde {filename}")
         except Exception as e:
-            self.error_log.log_error("LoadConfigError", f"Error cargando configuración: {e}", f"load {filename}")
+            self.error_log.log_error("LoadConfigError", f"Error cargando configuración: {e}", self._command_text)
             print(f"% Error cargando configuración: {e}")
-        print(self.get_prompt(), end='')
 
     def _show_help(self, args):
         """Muestra ayuda para los comandos disponibles"""
-        print("Comandos disponibles:")
-        for cmd, func in self.commands[self.current_device.mode].items():
-            if cmd not in ['help', 'exit', 'end']:
-                print(f"- {cmd}")
+        sys.stdout.write(self._help_text[self.current_device.mode])
+
+    def _complete(self, text, state):
+        """
+        Completador de readline: propone la siguiente palabra de las frases
+        del modo actual que empiezan por lo ya escrito en la línea.
+        """
+        if state == 0:
+            words = readline.get_line_buffer()[:readline.get_endidx()].split()
+            if words and not text:
+                typed = tuple(w.lower() for w in words)
+            else:
+                typed = tuple(w.lower() for w in words[:-1])
+            depth = len(typed)
+            self._completion_matches = sorted({
+                phrase[depth] for phrase in self._completions[self.current_device.mode]
+                if len(phrase) > depth and phrase[:depth] == typed
+                and phrase[depth].startswith(text.lower())
+            })
+        matches = self._completion_matches
+        return matches[state] + ' ' if state < len(matches) else None
 
     def start(self):
         """Inicia la interfaz de línea de comandos"""
+        if not sys.stdin.isatty():
+            self.run_batch(sys.stdin)
+            return
+
+        if readline is not None:
+            readline.set_completer(self._complete)
+            readline.set_completer_delims(' \t\n')  # '-' forma parte de palabras como avl-stats
+            readline.parse_and_bind('tab: complete')
+
         print("Red LAN - CLI")
         print("Escriba 'help' para ver comandos disponibles o 'exit' para salir\n")
-        
+
+        # Métodos ligados una sola vez fuera del bucle
+        get_prompt = self.get_prompt
+        is_exit = self._is_session_exit
+        parse = self.parse_tokens
         while True:
             try:
-                command = input(self.get_prompt()).strip()
-                if not command:
+                # Una sola división por línea: split() ya descarta los espacios
+                command = input(get_prompt())
+                parts = command.split()
+                if not parts:
                     continue
-                if command.lower() == 'exit':
-                    if self.current_device.mode in [Mode.USER, Mode.PRIVILEGED]:
-                        break
-                    else:
-                        self.parse_command(command)
-                else:
-                    self.parse_command(command)
-                    
+                if is_exit(parts):
+                    break
+                parse(parts, command)
+
             except KeyboardInterrupt:
                 print("\nSaliendo...")
                 break
+            except EOFError:
+                print()
+                break
             except Exception as e:
                 print(f"\nError: {e}")
 
+    def run_batch(self, lines):
+        """
+        Ejecuta comandos leídos de un iterable de líneas (p. ej. stdin redirigido)
+        sin mostrar prompts.
+        """
+        is_exit = self._is_session_exit
+        parse = self.parse_tokens
+        for line in lines:
+            parts = line.split()
+            if not parts:
+                continue
+            if is_exit(parts):
+                break
+            parse(parts, line)
+
+    def _is_session_exit(self, parts):
+        """Indica si 'exit' debe terminar la sesión (modos usuario y privilegiado)"""
+        return (len(parts) == 1 and parts[0].lower() == 'exit'
+                and self.current_device.mode in self.SESSION_EXIT_MODES)
+
     def _add_device(self, args):
         """Añade un nuevo dispositivo a la red"""
         if len(args) != 2:
@@ -702,20 +874,19 @@ class CLI:
     
         name, dtype = args[0], args[1].lower()
         
-        if dtype not in ['router', 'switch', 'host', 'firewall']:
-            self.error_log.log_error("InvalidDeviceType", f"Tipo de dispositivo inválido: {dtype}", f"add_device {name} {dtype}")
+        if dtype not in self.DEVICE_TYPES:
+            self.error_log.log_error("InvalidDeviceType", f"Tipo de dispositivo inválido: {dtype}", self._command_text)
             print("% Tipo de dispositivo inválido")
             return
             
         if self.network.get_device(name):
-            self.error_log.log_error("DeviceExists", f"El dispositivo {name} ya existe", f"add_device {name} {dtype}")
+            self.error_log.log_error("DeviceExists", f"El dispositivo {name} ya existe", self._command_text)
             print(f"% El dispositivo {name} ya existe")
             return
             
         device = Device(name, dtype)
         self.network.add_device(device)
         print(f"Dispositivo {name} ({dtype}) añadido")
-        print(self.get_prompt(), end='')
 
     def _remove_device(self, args):
         """Elimina un dispositivo de la red"""
@@ -727,23 +898,19 @@ class CLI:
         device = self.network.get_device(name)
         
         if not device:
-            self.error_log.log_error("DeviceNotFound", f"Dispositivo {name} no encontrado", f"remove_device {name}")
+            self.error_log.log_error("DeviceNotFound", f"Dispositivo {name} no encontrado", self._command_text)
             print(f"% Dispositivo {name} no encontrado")
             return
             
         # Verificar conexiones primero
-        connections = [c for c in self.network.connections 
-                    if c[0] == name or c[2] == name]
-        
-        if connections:
-            self.error_log.log_error("DeviceHasConnections", f"El dispositivo {name} tiene conexiones activas", f"remove_device {name}")
+        if self.network.has_connections(name):
+            self.error_log.log_error("DeviceHasConnections", f"El dispositivo {name} tiene conexiones activas", self._command_text)
             print("% Error: El dispositivo tiene conexiones activas")
             print("Desconéctelo primero con 'disconnect'")
             return
             
         self.network.remove_device(device)
         print(f"Dispositivo {name} eliminado")
-        print(self.get_prompt(), end='')
 
     def _add_interface(self, args):
         """Añade una interfaz a un dispositivo"""
@@ -755,26 +922,27 @@ class CLI:
         device = self.network.get_device(dev_name)
         
         if not device:
-            self.error_log.log_error("DeviceNotFound", f"Dispositivo {dev_name} no encontrado", f"add_interface {dev_name} {iface_name}")
+            self.error_log.log_error("DeviceNotFound", f"Dispositivo {dev_name} no encontrado", self._command_text)
             print(f"% Dispositivo {dev_name} no encontrado")
             return
             
         # Verificar si la interfaz ya existe
-        if any(iface.name == iface_name for iface in device.get_interfaces()):
-            self.error_log.log_error("InterfaceExists", f"La interfaz {iface_name} ya existe en {dev_name}", f"add_interface {dev_name} {iface_name}")
+        if device.get_interface(iface_name):
+            self.error_log.log_error("InterfaceExists", f"La interfaz {iface_name} ya existe en {dev_name}", self._command_text)
             print(f"% La interfaz {iface_name} ya existe en {dev_name}")
             return
             
         iface = Interface(iface_name)
         device.add_interface(iface)
         print(f"Interfaz {iface_name} añadida a {dev_name}")
-        print(self.get_prompt(), end='')
 
     def _console_device(self, args):
         if not args:
-            print("Dispositivos disponibles:")
-            for device in self.network.list_devices():
-                print(f"- {device.name} ({device.device_type})")
+            out = ["Dispositivos disponibles:"]
+            for device in self.network.devices:
+                out.append(f"- {device.name} ({device.device_type})")
+            out.append("")
+            sys.stdout.write("\n".join(out))
             return
         """Cambia al contexto de otro dispositivo"""
         if len(args) != 1:
@@ -785,7 +953,7 @@ class CLI:
         device = self.network.get_device(device_name)
         
         if not device:
-            self.error_log.log_error("DeviceNotFound", f"Dispositivo {device_name} no encontrado", f"console {device_name}")
+            self.error_log.log_error("DeviceNotFound", f"Dispositivo {device_name} no encontrado", self._command_text)
             print(f"% Dispositivo {device_name} no encontrado")
             return
         # Guardar el modo actual antes de cambiar
@@ -795,25 +963,24 @@ class CLI:
         # Restaurar el modo en el nuevo dispositivo
         self.current_device.mode = current_mode
         print(f"Cambiado al dispositivo {device_name}")
-        print(self.get_prompt(), end='')
 
     def _save_snapshot(self, args):
         """Guarda un snapshot con clave"""
         if len(args) != 1:
             print("Uso: save snapshot <key>")
             return
+        from Network_persistence import save_network_config
         key = args[0]
-        # Generar nombre de archivo único
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        filename = f"snap_{timestamp}.json"
+        # Generar nombre de archivo único: con nanosegundos, dos snapshots en
+        # el mismo segundo no comparten archivo
+        filename = f"snap_{time.time_ns()}.json"
         try:
             save_network_config(self.network, filename)
             self.btree.insert(key, filename)
             print(f"[OK] snapshot {key} -> file: {filename} (indexed)")
         except Exception as e:
-            self.error_log.log_error("SaveSnapshotError", f"Error guardando snapshot: {e}", f"save snapshot {key}")
+            self.error_log.log_error("SaveSnapshotError", f"Error guardando snapshot: {e}", self._command_text)
             print(f"% Error guardando snapshot: {e}")
-        print(self.get_prompt(), end='')
 
     def _load_config_key(self, args):
         """Carga configuración por clave"""
@@ -823,20 +990,19 @@ class CLI:
         key = args[0]
         filename = self.btree.search(key)
         if filename:
+            from Network_persistence import load_network_config
             try:
                 self.network = load_network_config(filename)
-                self.statistics = NetworkStatistics(self.network)
-                devices = self.network.list_devices()
-                if devices:
-                    self.current_device = devices[0]
+                first = self.network.first_device()
+                if first is not None:
+                    self.current_device = first
                 print(f"Configuración cargada desde {filename}")
             except Exception as e:
-                self.error_log.log_error("LoadConfigKeyError", f"Error cargando configuración: {e}", f"load config {key}")
+                self.error_log.log_error("LoadConfigKeyError", f"Error cargando configuración: {e}", self._command_text)
                 print(f"% Error cargando configuración: {e}")
         else:
-            self.error_log.log_error("KeyNotFound", f"Clave {key} no encontrada en el índice", f"load config {key}")
+            self.error_log.log_error("KeyNotFound", f"Clave {key} no encontrada en el índice", self._command_text)
             print(f"% Clave {key} no encontrada en el índice")
-        print(self.get_prompt(), end='')
 
     def _show_snapshots(self, args):
         """Muestra snapshots en orden"""
@@ -844,14 +1010,12 @@ class CLI:
         if not snapshots:
             print("No snapshots")
         else:
-            for key, filename in snapshots:
-                print(f"{key} -> {filename}")
+            sys.stdout.write(''.join(f"{key} -> {filename}\n" for key, filename in snapshots))
 
     def _btree_stats(self, args):
         """Muestra estadísticas del B-tree"""
         stats = self.btree.get_stats()
         print(f"order={stats['order']} height={stats['height']} nodes={stats['nodes']} splits={stats['splits']} merges={stats['merges']}")
-        print(self.get_prompt(), end='')
 
 
 import os
@@ -859,18 +1023,25 @@ import os
 def auto_load_config(cli, filename="running-config.json"):
     """Carga configuración automáticamente si existe el archivo JSON al iniciar."""
     if os.path.exists(filename):
+        from Network_persistence import load_network_config
         try:
             cli.network = load_network_config(filename)
-            cli.statistics = NetworkStatistics(cli.network)
-            devices = cli.network.list_devices()
-            if devices:
-                cli.current_device = devices[0]
+            first = cli.network.first_device()
+            if first is not None:
+                cli.current_device = first
+            cli.config_dirty = False
             print(f"Configuración cargada automáticamente desde {filename}")
         except Exception as e:
             print(f"% Error cargando configuración automática: {e}")
 
 def auto_save_config(cli, filename="running-config.json"):
-    """Guarda configuración automáticamente al salir del programa."""
+    """
+    Guarda configuración automáticamente al salir del programa, salvo que
+    ningún comando haya podido cambiarla desde que se cargó.
+    """
+    if not cli.config_dirty:
+        return
+    from Network_persistence import save_network_config
     try:
         save_network_config(cli.network, filename)
         print(f"Configuración guardada automáticamente en {filename}")
@@ -883,4 +1054,6 @@ if __name__ == "__main__":
     try:
         cli.start()
     finally:
+        if cli._btree is not None:  # Solo si se llegó a abrir el índice
+            cli._btree.flush()
         auto_save_config(cli)
\ No newline at end of file
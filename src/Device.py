@@ -1,3 +1,4 @@
+import sys
 from Mode import Mode
 from LinkedList import LinkedList
 from Queue import Queue
@@ -6,18 +7,33 @@ from AVLTree import AVLTree, Route
 from Trie import Trie
 from BST import BST
 
+# Sufijo del prompt por modo; el prompt completo se precalcula por dispositivo
+PROMPT_SUFFIXES = {
+    Mode.USER: ">",
+    Mode.PRIVILEGED: "#",
+    Mode.CONFIG: "(config)#",
+    Mode.CONFIG_IF: "(config-if)#",
+}
+
 class Device:
     """
     Representa un dispositivo de red (router, switch, host, firewall)..
     """
 
+    __slots__ = ('name', 'device_type', 'interfaces', 'status', 'packet_queue',
+                 'sent_stack', 'received_stack', 'mode', 'routing_table',
+                 'policy_trie', 'arp_table', '_prompt_cache',
+                 '_interfaces_by_name', 'network')
+
     def __init__(self, name, device_type):
         """
         Inicializa el dispositivo con nombre, tipo y estado.
         """
-        self.name = name
+        self.name = sys.intern(name)
         self.device_type = device_type
         self.interfaces = LinkedList()  # Lista enlazada de objetos Interface
+        self._interfaces_by_name = {}  # Índice nombre -> Interface
+        self.network = None  # Red a la que pertenece, asignada por Network.add_device
         self.status = 'up'    # 'up' (online) o 'down' (offline)
         self.packet_queue = Queue()  # Cola de paquetes entrantes/salientes
         self.sent_stack = Stack()      # Pila de historial de enviados
@@ -26,12 +42,51 @@ class Device:
         self.routing_table = AVLTree()  # Tabla de rutas AVL
         self.policy_trie = Trie()  # Trie para políticas de prefijos  
         self.arp_table = BST()  # BST para tabla ARP  
+        self._prompt_cache = {}  # Mode: prompt precalculado
+        self._rebuild_prompts()
+
+    def _rebuild_prompts(self):
+        """
+        Recalcula el prompt de cada modo para el nombre actual.
+        """
+        name = self.name
+        self._prompt_cache = {mode: name + suffix for mode, suffix in PROMPT_SUFFIXES.items()}
+
+    def set_name(self, name):
+        """
+        Cambia el nombre del dispositivo y actualiza sus prompts.
+        """
+        self.name = sys.intern(name)
+        self._rebuild_prompts()
+
+    def get_prompt(self):
+        """
+        Devuelve el prompt correspondiente al modo actual.
+        """
+        return self._prompt_cache.get(self.mode, ">")
 
     def add_interface(self, interface):
         """
         Agrega una interfaz al dispositivo.
         """
         self.interfaces.append(interface)
+        # Ante nombres repetidos se conserva la primera, como en un recorrido lineal
+        self._interfaces_by_name.setdefault(interface.name, interface)
+        interface.device = self
+        self.ip_changed()
+
+    def ip_changed(self):
+        """
+        Avisa a la red del dispositivo que cambió alguna de sus IPs o interfaces.
+        """
+        if self.network is not None:
+            self.network.invalidate_ip_index()
+
+    def get_interface(self, name):
+        """
+        Devuelve la interfaz con ese nombre, o None si no existe.
+        """
+        return self._interfaces_by_name.get(name)
 
     def set_status(self, status):
         """
@@ -79,7 +134,6 @@ class Device:
         """
         return self.packet_queue.dequeue()
 
-
     def get_sent(self):
         """
         Devuelve el historial de paquetes enviados (último primero).
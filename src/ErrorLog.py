@@ -1,34 +1,79 @@
+import time
 from Queue import Queue
 from datetime import datetime
 
 class ErrorEntry:
-    def __init__(self, error_type, message, command=None):
-        self.timestamp = datetime.now()
+    __slots__ = ('created', 'error_type', 'message', 'command')
+
+    def __init__(self, error_type, message, command=None, created=None):
+        # Se guarda el instante como float; el datetime se arma solo al mostrarlo
+        self.created = time.time() if created is None else created
         self.error_type = error_type
         self.message = message
         self.command = command
 
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self.created)
+
     def __str__(self):
         time_str = self.timestamp.strftime("%Y-%m-%d %H:%M:%S")
         cmd_str = f" (Comando: {self.command})" if self.command else ""
         return f"[{time_str}] {self.error_type}: {self.message}{cmd_str}"
 
 class ErrorLog:
-    def __init__(self, max_entries=100):
+    def __init__(self, max_entries=100, enabled=True):
         self.queue = Queue(max_entries)
+        self.enabled = enabled  # Si es False, log_error no registra ni formatea nada
+        self.counts = {}  # error_type: total registrado, incluso lo ya expulsado de la cola
 
     def log_error(self, error_type, message, command=None):
+        # message y command pueden ser funciones sin argumentos: solo se
+        # evalúan si el registro está activo
+        if not self.enabled:
+            return
+        if callable(message):
+            message = message()
+        if callable(command):
+            command = command()
+        counts = self.counts
+        counts[error_type] = counts.get(error_type, 0) + 1
         entry = ErrorEntry(error_type, message, command)
         self.queue.enqueue(entry)
 
+    def log_error_many(self, errors):
+        """
+        Registra varios errores (error_type, message[, command]) con una sola
+        comprobación de enabled y una sola lectura del reloj para todo el lote.
+        """
+        if not self.enabled:
+            return
+        created = time.time()
+        counts = self.counts
+        enqueue = self.queue.enqueue
+        for error in errors:
+            error_type, message = error[0], error[1]
+            command = error[2] if len(error) > 2 else None
+            if callable(message):
+                message = message()
+            if callable(command):
+                command = command()
+            counts[error_type] = counts.get(error_type, 0) + 1
+            enqueue(ErrorEntry(error_type, message, command, created))
+
     def get_errors(self, n=None):
         all_errors = self.queue.get_all()
         if n is None:
             return all_errors
         return all_errors[-n:]  # Últimos n
 
+    def get_counts(self):
+        """Totales por tipo de error sin recorrer la cola"""
+        return dict(self.counts)
+
     def clear(self):
         self.queue.clear()
+        self.counts.clear()
 
     def size(self):
         return self.queue.size()
@@ -1,34 +1,46 @@
+import re
+import sys
+from functools import lru_cache
 from Queue import Queue
-from LinkedList import LinkedList
+
+# Cuatro octetos decimales 0-255 (se admiten ceros a la izquierda)
+_OCTET = r"0*(?:25[0-5]|2[0-4][0-9]|1?[0-9]?[0-9])"
+_IP_RE = re.compile(rf"{_OCTET}\.{_OCTET}\.{_OCTET}\.{_OCTET}")
 
 class Interface:
     """
     Representa una interfaz de red de un dispositivo (ej: g0/0, eth0)..
     """
 
+    __slots__ = ('name', 'ip_address', 'status', 'neighbors', 'packet_queue', '_neighbor_names',
+                 'device')
+
     def __init__(self, name):
         """
         Inicializa la interfaz con nombre, sin IP y estado 'up'.
         """
-        self.name = name
+        self.name = sys.intern(name)
         self.ip_address = None
         self.status = 'up'  # 'up' (activa) o 'down' (inactiva)
-        self.neighbors = LinkedList()  # Interfaces conectadas (lista enlazada)
+        self.neighbors = {}  # Interfaces conectadas (dict usado como conjunto ordenado)
         self.packet_queue = Queue()  # Cola de paquetes para la interfaz
+        self._neighbor_names = ''  # Nombres de vecinos unidos; None si hay que recalcular
+        self.device = None  # Dispositivo dueño, asignado por Device.add_interface
 
     def set_ip(self, ip):
         """Asigna una dirección IP a la interfaz"""
-        if self._validate_ip(ip):
+        if self.validate_ip(ip):
             self.ip_address = ip
+            if self.device is not None:
+                self.device.ip_changed()
             return True
         return False
 
-    def _validate_ip(self, ip):
-        """Valida formato básico de dirección IP"""
-        parts = ip.split('.')
-        if len(parts) != 4:
-            return False
-        return all(part.isdigit() and 0 <= int(part) <= 255 for part in parts)
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def validate_ip(ip):
+        """Valida formato básico de dirección IP con una expresión precompilada (memoizada)"""
+        return _IP_RE.fullmatch(ip) is not None
 
     def shutdown(self):
         """
@@ -46,17 +58,28 @@ class Interface:
         """
         Conecta esta interfaz con otra interfaz (enlaza físicamente).
         """
-        if not self.neighbors.find(other_interface):
-            self.neighbors.append(other_interface)
-            other_interface.neighbors.append(self)
+        if other_interface not in self.neighbors:
+            self.neighbors[other_interface] = None
+            other_interface.neighbors[self] = None
+            self._neighbor_names = other_interface._neighbor_names = None
 
     def disconnect(self, other_interface):
         """
         Desconecta esta interfaz de otra interfaz.
         """
-        if self.neighbors.find(other_interface):
-            self.neighbors.remove(other_interface)
-            other_interface.neighbors.remove(self)
+        if other_interface in self.neighbors:
+            del self.neighbors[other_interface]
+            other_interface.neighbors.pop(self, None)
+            self._neighbor_names = other_interface._neighbor_names = None
+
+    def neighbor_names(self):
+        """
+        Devuelve los nombres de los vecinos separados por comas ('' si no hay).
+        Se calcula solo tras conectar o desconectar.
+        """
+        if self._neighbor_names is None:
+            self._neighbor_names = ', '.join(n.name for n in self.neighbors)
+        return self._neighbor_names
 
     def enqueue_packet(self, packet):
         """
@@ -82,8 +105,5 @@ class Interface:
         """
         ip = self.ip_address if self.ip_address else "Sin IP"
         estado = "Activa" if self.status == 'up' else "Inactiva"
-        vecinos = "Sin conexiones"
-        if hasattr(self.neighbors, 'to_list'):
-            vecinos_list = self.neighbors.to_list()
-            vecinos = ', '.join([n.name for n in vecinos_list]) if vecinos_list else "Sin conexiones"
+        vecinos = self.neighbor_names() or "Sin conexiones"
         return f"{self.name} | IP: {ip} | Estado: {estado} | Vecinos: {vecinos}"
@@ -1,4 +1,4 @@
-
+import sys
 from LinkedList import LinkedList
 from Packet import Packet
 
@@ -12,6 +12,7 @@ class Network:
         """
         Inicializa la red con una lista enlazada de dispositivos y variables para estadísticas.
         - devices: LinkedList de objetos Device presentes en la red.
+        - connections: conjunto de conexiones normalizadas (ver _connection_key).
         - total_packets_sent: total de paquetes enviados.
         - total_packets_delivered: total de paquetes entregados exitosamente.
         - total_packets_dropped: total de paquetes descartados por TTL.
@@ -19,19 +20,44 @@ class Network:
         - device_activity: diccionario con la cantidad de paquetes procesados por cada dispositivo.
         """
         self.devices = LinkedList()  # LinkedList de objetos Device
-        self.connections = []
+        self._devices_by_name = {}  # name: Device, primera coincidencia en orden
+        self.connections = set()
+        self._adjacency = {}  # device_name: set de claves de conexión en las que participa
         self.total_packets_sent = 0
         self.total_packets_delivered = 0
         self.total_packets_dropped = 0
         self.hops_sum = 0
         self.device_activity = {}  # device_name: cantidad de paquetes procesados
+        self._ip_index = None  # ip: (Device, Interface), primera coincidencia; None si hay que reconstruirlo
+        self.error_log = None  # ErrorLog opcional, asignado por la CLI
+
+    def clear(self):
+        """
+        Vacía la red (dispositivos, conexiones y estadísticas) conservando el
+        objeto, para reutilizarlo al cargar una nueva configuración.
+        """
+        for device in self.devices:
+            device.network = None
+        self.devices = LinkedList()
+        self._devices_by_name.clear()
+        self.connections.clear()
+        self._adjacency.clear()
+        self.total_packets_sent = 0
+        self.total_packets_delivered = 0
+        self.total_packets_dropped = 0
+        self.hops_sum = 0
+        self.device_activity.clear()
+        self._ip_index = None
 
     def add_device(self, device):
         """
         Agrega un nuevo dispositivo a la red y lo registra en las estadísticas.
         """
         self.devices.append(device)
+        self._devices_by_name.setdefault(device.name, device)
         self.device_activity[device.name] = 0
+        device.network = self
+        self._ip_index = None
 
     def remove_device(self, device):
         """
@@ -39,34 +65,115 @@ class Network:
         """
         if self.devices.find(device):
             self.devices.remove(device)
+            self._reindex_name(device.name)
             self.device_activity.pop(device.name, None)
+            device.network = None
+            self._ip_index = None
 
     def get_device(self, name):
         """
         Busca y retorna un dispositivo por su nombre.
         Si no existe, retorna None.
         """
-        for d in self.devices.to_list():
+        return self._devices_by_name.get(name)
+
+    def _reindex_name(self, name):
+        """
+        Vuelve a apuntar el índice de un nombre al primer dispositivo que lo
+        tenga, o lo elimina si ya no queda ninguno.
+        """
+        for d in self.devices:
             if d.name == name:
-                return d
-        return None
+                self._devices_by_name[name] = d
+                return
+        self._devices_by_name.pop(name, None)
+
+    def rename_device(self, device, new_name):
+        """
+        Cambia el nombre de un dispositivo de la red manteniendo el índice
+        por nombre y sus estadísticas. Retorna False si no pertenece a la red.
+        """
+        old_name = device.name
+        if self._devices_by_name.get(old_name) is not device:
+            return False
+        device.set_name(new_name)
+        self._reindex_name(old_name)
+        self._devices_by_name.setdefault(device.name, device)
+        if old_name in self.device_activity:
+            self.device_activity[device.name] = self.device_activity.pop(old_name)
+        return True
+
+    def find_by_ip(self, ip):
+        """
+        Retorna (dispositivo, interfaz) que tiene la IP dada, o None.
+        El índice se reconstruye solo si cambió alguna IP o la topología.
+        """
+        index = self._ip_index
+        if index is None:
+            index = {}
+            for device in self.devices:
+                for iface in device.interfaces:
+                    if iface.ip_address is not None:
+                        index.setdefault(iface.ip_address, (device, iface))
+            self._ip_index = index
+        return index.get(ip)
+
+    def invalidate_ip_index(self):
+        """
+        Marca el índice por IP como desactualizado; lo llaman los dispositivos
+        de esta red cuando cambia alguna de sus IPs o interfaces.
+        """
+        self._ip_index = None
+
+    @staticmethod
+    def _connection_key(device1_name, iface1_name, device2_name, iface2_name):
+        """
+        Devuelve la tupla canónica de una conexión, ordenando ambos extremos
+        para que (a, b) y (b, a) representen el mismo enlace.
+        Los nombres se internan para compartir un único objeto por nombre.
+        """
+        end1 = (sys.intern(device1_name), sys.intern(iface1_name))
+        end2 = (sys.intern(device2_name), sys.intern(iface2_name))
+        if end2 < end1:
+            end1, end2 = end2, end1
+        return end1 + end2
+
+    def _find_interfaces(self, device1_name, iface1_name, device2_name, iface2_name):
+        """
+        Resuelve una sola vez las interfaces de ambos extremos.
+        Retorna (iface1, iface2), o None si falta algún dispositivo o interfaz.
+        """
+        d1 = self.get_device(device1_name)
+        if not d1:
+            return None
+        d2 = self.get_device(device2_name)
+        if not d2:
+            return None
+        iface1 = d1.get_interface(iface1_name)
+        if not iface1:
+            return None
+        iface2 = d2.get_interface(iface2_name)
+        if not iface2:
+            return None
+        return iface1, iface2
 
     def connect(self, device1_name, iface1_name, device2_name, iface2_name):
         """
         Conecta dos interfaces de dos dispositivos distintos.
         Retorna True si la conexión fue exitosa, False en caso contrario.
         """
-        d1 = self.get_device(device1_name)
-        d2 = self.get_device(device2_name)
-        if d1 and d2:
-            iface1 = next((i for i in d1.interfaces if i.name == iface1_name), None)
-            iface2 = next((i for i in d2.interfaces if i.name == iface2_name), None)
-            if iface1 and iface2:
-                iface1.connect(iface2)
-                self.connections.append((device1_name, iface1_name, device2_name, iface2_name))
-                return True
-        if hasattr(self, 'error_log'):
-            self.error_log.log_error("ConnectionError", f"No se pudo conectar {device1_name}:{iface1_name} a {device2_name}:{iface2_name}")
+        ifaces = self._find_interfaces(device1_name, iface1_name, device2_name, iface2_name)
+        if ifaces:
+            iface1, iface2 = ifaces
+            iface1.connect(iface2)
+            key = self._connection_key(device1_name, iface1_name, device2_name, iface2_name)
+            self.connections.add(key)
+            adjacency = self._adjacency
+            adjacency.setdefault(key[0], set()).add(key)
+            adjacency.setdefault(key[2], set()).add(key)
+            return True
+        if self.error_log is not None:
+            self.error_log.log_error("ConnectionError", lambda: f"No se pudo conectar {device1_name}:{iface1_name} a {device2_name}:{iface2_name}")
         return False
 
     def disconnect(self, device1_name, iface1_name, device2_name, iface2_name):
@@ -74,27 +181,44 @@ class Network:
         Desconecta dos interfaces de dos dispositivos distintos.
         Retorna True si la desconexión fue exitosa, False en caso contrario.
         """
-        d1 = self.get_device(device1_name)
-        d2 = self.get_device(device2_name)
-        if d1 and d2:
-            iface1 = next((i for i in d1.interfaces if i.name == iface1_name), None)
-            iface2 = next((i for i in d2.interfaces if i.name == iface2_name), None)
-            if iface1 and iface2:
-                iface1.disconnect(iface2)
-                conn = (device1_name, iface1_name, device2_name, iface2_name)
-                if conn in self.connections:
-                    self.connections.remove(conn)
-                return True
-        if hasattr(self, 'error_log'):
-            self.error_log.log_error("DisconnectionError", f"No se pudo desconectar {device1_name}:{iface1_name} de {device2_name}:{iface2_name}")
+        ifaces = self._find_interfaces(device1_name, iface1_name, device2_name, iface2_name)
+        if ifaces:
+            iface1, iface2 = ifaces
+            iface1.disconnect(iface2)
+            key = self._connection_key(device1_name, iface1_name, device2_name, iface2_name)
+            self.connections.discard(key)
+            for name in (key[0], key[2]):
+                keys = self._adjacency.get(name)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._adjacency[name]
+            return True
+        if self.error_log is not None:
+            self.error_log.log_error("DisconnectionError", lambda: f"No se pudo desconectar {device1_name}:{iface1_name} de {device2_name}:{iface2_name}")
         return False
 
+    def has_connections(self, device_name):
+        """
+        Indica si el dispositivo participa en alguna conexión, sin recorrer
+        el conjunto completo de conexiones.
+        """
+        return bool(self._adjacency.get(device_name))
+
     def list_devices(self):
         """
         Devuelve la lista de todos los dispositivos presentes en la red como lista de Python.
         """
         return self.devices.to_list()
 
+    def first_device(self):
+        """
+        Devuelve el primer dispositivo de la red sin construir la lista completa.
+        Si la red está vacía, retorna None.
+        """
+        head = self.devices.head
+        return head.data if head else None
+
     def set_device_status(self, device_name, status):
         """
         Cambia el estado ('up' o 'down') de un dispositivo por su nombre.
@@ -111,13 +235,12 @@ class Network:
         Crea y encola un paquete en la interfaz correspondiente al source_ip.
         Retorna True si el paquete fue encolado, False si no se encontró la interfaz.
         """
-        for device in self.devices:
-            for iface in device.interfaces:
-                if iface.ip_address == source_ip:
-                    packet = Packet(source_ip, destination_ip, content, ttl)
-                    iface.enqueue_packet(packet)
-                    self.total_packets_sent += 1
-                    return True
+        found = self.find_by_ip(source_ip)
+        if found:
+            packet = Packet(source_ip, destination_ip, content, ttl)
+            found[1].enqueue_packet(packet)
+            self.total_packets_sent += 1
+            return True
         return False
 
     def tick(self):
@@ -128,73 +251,81 @@ class Network:
         - Si el TTL expira, el paquete se descarta.
         - Si no, se reenvía a los vecinos conectados.
         """
-        for device in self.devices:
-            if device.status == 'up':
-                for iface in device.interfaces:
-                    if iface.status == 'up':
-                        packet = iface.dequeue_packet()
-                        if packet:
-                            packet.hop(device.name)
-                            self.device_activity[device.name] += 1
-                            # Si llegó al destino
-                            if packet.destination_ip == iface.ip_address:
-                                device.receive_packet(packet)
-                                self.total_packets_delivered += 1
-                                self.hops_sum += len(packet.path)
-                            elif packet.is_expired():
-                                self.total_packets_dropped += 1
-                                if hasattr(self, 'error_log'):
-                                    self.error_log.log_error("PacketExpired", f"TTL expirado para paquete {packet.source_ip} -> {packet.destination_ip}")
-                            else:
-                                # Aplicar políticas del Trie antes de lookup de ruta
-                                policy = device.get_policy(packet.destination_ip)
-                                if policy:
-                                    if 'block' in policy:
-                                        self.total_packets_dropped += 1
-                                        if hasattr(self, 'error_log'):
-                                            self.error_log.log_error("PacketBlocked", f"Paquete bloqueado por política: {packet.source_ip} -> {packet.destination_ip}")
-                                        continue
-                                    elif 'ttl-min' in policy:
-                                        if packet.ttl < policy['ttl-min']:
-                                            packet.ttl = policy['ttl-min']
-                                
-                                # Verificar TTL después de ajuste
-                                if packet.is_expired():
+        # Errores del paso acumulados y registrados en lote al final; si el
+        # registro está desactivado no se formatea ningún mensaje por paquete
+        errors = [] if self.error_log is not None and self.error_log.enabled else None
+        try:
+            for device in self.devices:
+                if device.status == 'up':
+                    for iface in device.interfaces:
+                        if iface.status == 'up':
+                            packet = iface.dequeue_packet()
+                            if packet:
+                                packet.hop(device.name)
+                                self.device_activity[device.name] += 1
+                                # Si llegó al destino
+                                if packet.destination_ip == iface.ip_address:
+                                    device.receive_packet(packet)
+                                    self.total_packets_delivered += 1
+                                    self.hops_sum += len(packet.path)
+                                elif packet.is_expired():
                                     self.total_packets_dropped += 1
-                                    if hasattr(self, 'error_log'):
-                                        self.error_log.log_error("PacketExpiredAfterPolicy", f"TTL expirado después de política para paquete {packet.source_ip} -> {packet.destination_ip}")
-                                    continue
+                                    if errors is not None:
+                                        errors.append(("PacketExpired", f"TTL expirado para paquete {packet.source_ip} -> {packet.destination_ip}"))
+                                else:
+                                    # Aplicar políticas del Trie antes de lookup de ruta
+                                    policy = device.get_policy(packet.destination_ip)
+                                    if policy:
+                                        if 'block' in policy:
+                                            self.total_packets_dropped += 1
+                                            if errors is not None:
+                                                errors.append(("PacketBlocked", f"Paquete bloqueado por política: {packet.source_ip} -> {packet.destination_ip}"))
+                                            continue
+                                        elif 'ttl-min' in policy:
+                                            if packet.ttl < policy['ttl-min']:
+                                                packet.ttl = policy['ttl-min']
                                 
-                                # Usar tabla de rutas para reenviar
-                                route = device.lookup_route(packet.destination_ip)
-                                if route:
-                                    # Encontrar interfaz conectada al next_hop
-                                    next_iface = None
-                                    for iface in device.interfaces:
-                                        if iface.ip_address == route.next_hop:
-                                            next_iface = iface
-                                            break
-                                    if next_iface:
-                                        # Reenviar por esa interfaz
-                                        for neighbor in next_iface.neighbors:
-                                            if neighbor.status == 'up':
-                                                neighbor.enqueue_packet(packet)
-                                                # Aprender ARP
-                                                device.arp_table.insert(neighbor.ip_address, neighbor)
-                                    else:
-                                        # No se encontró interfaz, descartar
+                                    # Verificar TTL después de ajuste
+                                    if packet.is_expired():
                                         self.total_packets_dropped += 1
-                                        if hasattr(self, 'error_log'):
-                                            self.error_log.log_error("NoInterface", f"No se encontró interfaz para next-hop {route.next_hop} en {device.name}")
-                                else:
-                                    # No hay ruta, reenviar a vecinos directos
-                                    for iface in device.interfaces:
-                                        if iface.status == 'up':
-                                            for neighbor in iface.neighbors:
+                                        if errors is not None:
+                                            errors.append(("PacketExpiredAfterPolicy", f"TTL expirado después de política para paquete {packet.source_ip} -> {packet.destination_ip}"))
+                                        continue
+                                
+                                    # Usar tabla de rutas para reenviar
+                                    route = device.lookup_route(packet.destination_ip)
+                                    if route:
+                                        # Encontrar interfaz conectada al next_hop
+                                        next_iface = None
+                                        for iface in device.interfaces:
+                                            if iface.ip_address == route.next_hop:
+                                                next_iface = iface
+                                                break
+                                        if next_iface:
+                                            # Reenviar por esa interfaz
+                                            for neighbor in next_iface.neighbors:
                                                 if neighbor.status == 'up':
                                                     neighbor.enqueue_packet(packet)
                                                     # Aprender ARP
                                                     device.arp_table.insert(neighbor.ip_address, neighbor)
+                                        else:
+                                            # No se encontró interfaz, descartar
+                                            self.total_packets_dropped += 1
+                                            if errors is not None:
+                                                errors.append(("NoInterface", f"No se encontró interfaz para next-hop {route.next_hop} en {device.name}"))
+                                    else:
+                                        # No hay ruta, reenviar a vecinos directos
+                                        for iface in device.interfaces:
+                                            if iface.status == 'up':
+                                                for neighbor in iface.neighbors:
+                                                    if neighbor.status == 'up':
+                                                        neighbor.enqueue_packet(packet)
+                                                        # Aprender ARP
+                                                        device.arp_table.insert(neighbor.ip_address, neighbor)
+        finally:
+            # Se registra también lo acumulado si el paso se interrumpe
+            if errors:
+                self.error_log.log_error_many(errors)
         # No retorna nada, solo procesa un paso de simulación
 
     def show_statistics(self):
@@ -220,15 +351,18 @@ class Network:
     def remove_device(self, device):
         """Elimina un dispositivo de la red"""
         # Eliminar primero todas sus conexiones
-        connections = [c for c in self.connections 
-                    if c[0] == device.name or c[2] == device.name]
-        
+        # Copia: disconnect modifica el índice mientras se recorre
+        connections = list(self._adjacency.get(device.name, ()))
+
         for conn in connections:
             self.disconnect(*conn)
         
         # Luego eliminar el dispositivo
         if self.devices.find(device):
             self.devices.remove(device)
+            self._reindex_name(device.name)
             self.device_activity.pop(device.name, None)
+            device.network = None
+            self._ip_index = None
             return True
         return False
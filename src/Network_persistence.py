@@ -7,37 +7,50 @@ from Device import Device
 from Interface import Interface
 from Network import Network
 
+try:
+    import orjson  # Codificador/decodificador opcional, bastante más rápido que json
+    _loads = orjson.loads
+    _encode = orjson.dumps  # Ya produce bytes compactos
+except ImportError:
+    _loads = json.loads
+    _json_encode = json.JSONEncoder(separators=(',', ':')).encode  # Compacto: el archivo se consume por máquina
+
+    def _encode(obj):
+        return _json_encode(obj).encode()
+
+def _write_device(f, device):
+    """Escribe el registro de un dispositivo campo a campo, sin diccionarios intermedios."""
+    f.write(b'{"name":%s,"type":%s,"status":%s,"interfaces":[' % (
+        _encode(device.name), _encode(device.device_type), _encode(device.status)))
+    for i, iface in enumerate(device.interfaces):
+        f.write(b'%s{"name":%s,"ip":%s,"status":%s}' % (
+            b',' if i else b'', _encode(iface.name), _encode(iface.ip_address), _encode(iface.status)))
+    f.write(b'],"routing_table":%s,"policies":%s}' % (
+        _encode(device.get_routing_table_data()), _encode(device.get_policy_data())))
+
 def save_network_config(network, filename="running-config.json"):
-    config = {
-        'devices': [],
-        'connections': []
-    }
-    for device in network.list_devices():
-        device_data = {
-            'name': device.name,
-            'type': device.device_type,
-            'status': device.status,
-            'interfaces': [],
-            'routing_table': device.get_routing_table_data(),
-            'policies': device.get_policy_data()
-        }
-        for iface in device.get_interfaces():
-            iface_data = {
-                'name': iface.name,
-                'ip': iface.ip_address,
-                'status': iface.status
-            }
-            device_data['interfaces'].append(iface_data)
-        config['devices'].append(device_data)
-    for conn in network.connections:
-        config['connections'].append(conn)
-    with open(filename, 'w') as f:
-        json.dump(config, f, indent=2)
+    """
+    Guarda la configuración escribiendo un dispositivo por línea, sin construir
+    antes el documento completo en memoria.
+    """
+    # Escritura binaria: los fragmentos codificados ya son bytes UTF-8
+    with open(filename, 'wb') as f:
+        f.write(b'{"devices":[')
+        for i, device in enumerate(network.devices):
+            f.write(b',\n' if i else b'\n')
+            _write_device(f, device)
+        f.write(b'\n],"connections":')
+        f.write(_encode(sorted(network.connections)))
+        f.write(b'}\n')
     print(f"Configuración guardada en {filename}")
 
+def read_config_file(filename):
+    """Lee un archivo de configuración en binario y lo decodifica."""
+    with open(filename, 'rb') as f:
+        return _loads(f.read())
+
 def load_network_config(filename):
-    with open(filename) as f:
-        config = json.load(f)
+    config = read_config_file(filename)
     network = Network()
     for device_data in config['devices']:
         device = Device(device_data['name'], device_data['type'])
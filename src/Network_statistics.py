@@ -8,6 +8,10 @@ class NetworkStatistics:
     def __init__(self, network):
         self.network = network
 
+    def rebind(self, network):
+        """Apunta las estadísticas a otra red, reutilizando este objeto"""
+        self.network = network
+
     def get_statistics(self):
         total_sent = 0
         delivered = 0
@@ -17,7 +21,7 @@ class NetworkStatistics:
         packet_count = 0
         device_activity = {}
 
-        for device in self.network.list_devices():
+        for device in self.network.devices:
             device_activity[device.name] = 0
             sent, received = device.get_history()
             for packet in sent + received:
@@ -5,6 +5,9 @@ class Packet:
     """
     Representa un paquete de red virtual para el simulador LAN..
     """
+
+    __slots__ = ('id', 'source_ip', 'destination_ip', 'content', 'ttl', 'path')
+
     def __init__(self, source_ip, destination_ip, content, ttl=5):
         """
         Inicializa el paquete con origen, destino, contenido, TTL y ruta.
@@ -1,71 +1,39 @@
-from Node import Node
+from collections import deque
 
 class Stack:
-    """Implementación de pila para historial de paquetes usando nodos enlazados"""
+    """Implementación de pila para historial de paquetes sobre collections.deque acotada"""
     def __init__(self, max_size=100):
-        self.top = None
-        self._size = 0
         self.max_size = max_size
+        self._items = deque(maxlen=max_size)  # La cima es el extremo derecho
 
     def push(self, item):
         """Apila un elemento, removiendo el más antiguo si se excede el tamaño máximo"""
-        if self._size >= self.max_size:
-            self._remove_bottom()
-        new_node = Node(item)
-        new_node.next = self.top
-        self.top = new_node
-        self._size += 1
+        self._items.append(item)
 
     def pop(self):
         """Desapila un elemento"""
-        if self.top:
-            value = self.top.data
-            self.top = self.top.next
-            self._size -= 1
-            return value
+        if self._items:
+            return self._items.pop()
         return None
 
     def is_empty(self):
         """Verifica si la pila está vacía"""
-        return self._size == 0
+        return not self._items
 
     def peek(self):
         """Mira el elemento superior sin desapilar"""
-        if self.top:
-            return self.top.data
+        if self._items:
+            return self._items[-1]
         return None
 
     def size(self):
         """Tamaño actual de la pila"""
-        return self._size
+        return len(self._items)
 
     def clear(self):
         """Vacía la pila"""
-        self.top = None
-        self._size = 0
+        self._items.clear()
 
     def get_all(self):
         """Obtiene todos los elementos en orden LIFO"""
-        result = []
-        current = self.top
-        while current:
-            result.append(current.data)
-            current = current.next
-        return result
-
-    def _remove_bottom(self):
-        """Remueve el nodo más antiguo (fondo de la pila) si se excede el tamaño máximo."""
-        if self.top is None:
-            return
-        if self.top.next is None:
-            self.top = None
-            self._size -= 1
-            return
-        prev = None
-        current = self.top
-        while current.next:
-            prev = current
-            current = current.next
-        if prev:
-            prev.next = None
-            self._size -= 1
\ No newline at end of file
+        return list(reversed(self._items))
\ No newline at end of file
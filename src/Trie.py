@@ -8,14 +8,13 @@ class Trie:
     def __init__(self):
         self.root = TrieNode()
 
-    def _ip_to_binary(self, ip):
-        """Convierte IP a lista de bits"""
+    def _ip_to_int(self, ip):
+        """Convierte IP a (entero, número de bits); los bits se leen con desplazamientos"""
         parts = ip.split('.')
-        binary = []
+        value = 0
         for part in parts:
-            bin_part = format(int(part), '08b')
-            binary.extend([int(b) for b in bin_part])
-        return binary
+            value = (value << 8) | int(part)
+        return value, 8 * len(parts)
 
     def _mask_to_length(self, mask):
         """Convierte máscara a longitud de prefijo"""
@@ -27,22 +26,25 @@ class Trie:
             parts = mask.split('.')
             if len(parts) != 4:
                 return None
-            binary = []
+            value = 0
             for part in parts:
-                binary.extend(format(int(part), '08b'))
-            return sum(1 for b in binary if b == '1')
+                octet = int(part)
+                if not 0 <= octet <= 255:
+                    return None  # Octeto fuera de rango: máscara inválida
+                value = (value << 8) | octet
+            return value.bit_count()
         except ValueError:
             return None
 
     def insert(self, prefix, mask, policy_type, policy_value=None):
         """Inserta un prefijo con política"""
-        binary = self._ip_to_binary(prefix)
+        value, width = self._ip_to_int(prefix)
         mask_len = self._mask_to_length(mask)
-        if mask_len is None:
+        if mask_len is None or mask_len > width:
             raise ValueError("Máscara inválida")
         node = self.root
         for i in range(mask_len):
-            bit = binary[i]
+            bit = (value >> (width - 1 - i)) & 1
             if node.children[bit] is None:
                 node.children[bit] = TrieNode()
             node = node.children[bit]
@@ -55,14 +57,14 @@ class Trie:
 
     def delete(self, prefix, mask):
         """Elimina la política de un prefijo"""
-        binary = self._ip_to_binary(prefix)
+        value, width = self._ip_to_int(prefix)
         mask_len = self._mask_to_length(mask)
-        if mask_len is None:
+        if mask_len is None or mask_len > width:
             raise ValueError("Máscara inválida")
         node = self.root
         path = []
         for i in range(mask_len):
-            bit = binary[i]
+            bit = (value >> (width - 1 - i)) & 1
             if node.children[bit] is None:
                 return  # No existe
             path.append((node, bit))
@@ -74,13 +76,13 @@ class Trie:
 
     def search(self, ip):
         """Busca la política para la IP (longest prefix match)"""
-        binary = self._ip_to_binary(ip)
+        value, width = self._ip_to_int(ip)
         node = self.root
         best_policy = {}
-        for bit in binary:
-            if node.children[bit] is None:
+        for shift in range(width - 1, -1, -1):
+            node = node.children[(value >> shift) & 1]
+            if node is None:
                 break
-            node = node.children[bit]
             if node.policy:
                 best_policy = node.policy
         return best_policy